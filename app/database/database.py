@@ -1,21 +1,164 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from fastapi import Depends
+from app.database.pool import get_engine_options
+from app.settings import get_settings
+from app.utils.metrics import instrument_engine
+from starlette.concurrency import run_in_threadpool
+import functools
+import inspect
+import threading
 
-load_dotenv()
+settings = get_settings()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# "sync" runs database work in FastAPI's threadpool, "async" on the event loop
+DB_MODE = settings.db_mode
+
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+class _LazySessionMaker(sessionmaker):
+    """sessionmaker that creates the engine the first time a session is opened"""
+
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+# Engines are created on first use, so importing the app loads no database
+# driver and opens no connection; the async engine additionally is only
+# needed when DB_MODE=async
+_engine = None
+_engine_lock = threading.Lock()
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_engine():
+    """The sync engine, created and bound to SessionLocal on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL is not set")
+                engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+                instrument_engine(engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+def get_engine_if_created():
+    """The sync engine, or None if nothing has used it yet"""
+    return _engine
+
+def dispose_engine():
+    """Close the sync engine's pooled connections, if it was ever created"""
+    if _engine is not None:
+        _engine.dispose()
+
+def __getattr__(name):
+    # `engine` stays importable for scripts; accessing it creates the engine
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_async_database_url() -> str:
+    """Async database URL, derived from DATABASE_URL unless ASYNC_DATABASE_URL is set"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    url = make_url(DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        async_url = get_async_database_url()
+        _async_engine = create_async_engine(async_url, **get_engine_options(async_url, use_async=True))
+        instrument_engine(_async_engine.sync_engine)
+        # Objects must stay readable after commit without lazy loading on the event loop
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=_async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+def get_async_engine_if_created():
+    """The async engine, or None if nothing has used it yet"""
+    return _async_engine
+
+async def dispose_async_engine():
+    """Close the async engine's pooled connections, if it was ever created"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
+
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+# Session dependency shared by the routes and the auth dependencies for the configured mode
+get_session = get_async_db if DB_MODE == "async" else get_db
+
+async def run_db(db, fn, *args):
+    """
+    Run the blocking function `fn(session, *args)` without blocking the event loop:
+    through AsyncSession.run_sync for async sessions, or in the threadpool for sync ones
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+async def release_db(db):
+    """Return the session's connection to the pool; the session stays usable"""
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+
+def db_route(endpoint):
+    """
+    Make a route written against a sync Session follow DB_MODE.
+
+    In sync mode the route is returned unchanged and FastAPI runs it in the
+    threadpool. In async mode its `db` dependency is swapped for an
+    AsyncSession and the body runs through AsyncSession.run_sync, so the
+    database I/O happens on the event loop instead of a worker thread.
+    """
+    if DB_MODE != "async":
+        return endpoint
+
+    signature = inspect.signature(endpoint)
+    parameters = [
+        parameter.replace(default=Depends(get_async_db)) if parameter.name == "db" else parameter
+        for parameter in signature.parameters.values()
+    ]
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        db = kwargs.pop("db")
+        return await db.run_sync(lambda session: endpoint(*args, db=session, **kwargs))
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
@@ -0,0 +1,51 @@
+from app.database.database import Base, get_engine
+from app.settings import PROJECT_ROOT, get_settings
+
+class SchemaOutOfDateError(RuntimeError):
+    """Raised at startup when the database is not at the latest Alembic revision"""
+
+def get_migration_heads() -> set:
+    """Head revisions of the migration scripts shipped with the code"""
+    # Alembic is imported here so importing the app does not pay for it
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "migrations"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+def get_database_revisions(connection) -> set:
+    """Revisions recorded in the database's alembic_version table (empty if none)"""
+    from alembic.runtime.migration import MigrationContext
+
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+def prepare_database(mode: str = None):
+    """
+    Make sure the database schema matches the code before serving requests.
+
+    "migrations" (the default) only compares the database's Alembic revision
+    with the migration heads and raises SchemaOutOfDateError if they differ;
+    the schema itself is changed exclusively by `alembic upgrade head`.
+    "create" creates missing tables from the models, for development and
+    tests. "off" skips the check.
+    """
+    mode = mode or get_settings().schema_check
+    if mode == "off":
+        return
+    # Importing the models registers their tables on Base.metadata
+    import app.models.models  # noqa: F401
+
+    engine = get_engine()
+    if mode == "create":
+        Base.metadata.create_all(bind=engine)
+        return
+
+    with engine.connect() as connection:
+        current = get_database_revisions(connection)
+    expected = get_migration_heads()
+    if current != expected:
+        raise SchemaOutOfDateError(
+            f"Database is at revision {', '.join(sorted(current)) or 'none'}, "
+            f"expected {', '.join(sorted(expected))}; run `alembic upgrade head`"
+        )
@@ -1,17 +1,52 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import time
 
-from app.database.database import engine, Base, get_db
-from app.routers import auth, users, availability, appointments
+from app.database.database import get_db, get_engine, dispose_engine, get_async_engine_if_created, dispose_async_engine
+from app.database.pool import pool_status
+from app.database.schema import prepare_database
+from app.settings import get_settings
+from app.utils.archive import ARCHIVE_JOB_ENABLED, run_archive_job
+from app.utils.auth import user_cache, token_cache
+from app.utils.hashing import password_pool
+from app.utils.metrics import METRICS_ENABLED, MetricsMiddleware, metrics
+from app.utils.ical import calendar_cache
+from app.utils.slot_cache import slot_cache
+from app.utils.slot_events import slot_events
+from app.utils.slot_table import SLOT_TABLE_ENABLED, run_roll_forward_job
+from app.routers import auth, users, availability, appointments, calendar
 
-# Create the database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate settings and the database schema before serving; release resources on shutdown"""
+    if not get_settings().secret_key:
+        raise RuntimeError("SECRET_KEY is not set")
+    # Connects to the database for the first time, off the event loop
+    await run_in_threadpool(prepare_database)
+    # Keep the materialized slot horizon rolling forward while the worker runs
+    roll_forward = asyncio.create_task(run_roll_forward_job()) if SLOT_TABLE_ENABLED else None
+    # Keep old appointments out of the hot table
+    archival = asyncio.create_task(run_archive_job()) if ARCHIVE_JOB_ENABLED else None
+    yield
+    for job in (roll_forward, archival):
+        if job is not None:
+            job.cancel()
+    # Release pooled database connections and hashing workers when the worker stops
+    await dispose_async_engine()
+    dispose_engine()
+    password_pool.shutdown()
 
 app = FastAPI(
     title="Doctor Appointment Scheduler API",
     description="API for scheduling doctor appointments with 40-minute time slots",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -27,13 +62,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Request and SQL metrics, served at /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(availability.router)
 app.include_router(appointments.router)
+app.include_router(calendar.router)
 
 @app.get("/")
 def read_root():
@@ -41,10 +82,27 @@ def read_root():
 
 @app.get("/health-check")
 def health_check(db: Session = Depends(get_db)):
-    """Check if the API and database connection are working"""
+    """Check if the API and database connection are working, with pool, cache and event stream telemetry"""
+    pools = {"sync": pool_status(get_engine())}
+    async_engine = get_async_engine_if_created()
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine)
+    caches = {"users": user_cache.stats(), "tokens": token_cache.stats(), "slots": slot_cache.stats(), "calendar": calendar_cache.stats()}
+    streams = slot_events.stats()
+    
     try:
-        # Try to connect to the database
-        db.execute("SELECT 1")
-        return {"status": "healthy", "database": "connected"}
+        # Time a full round trip to the database
+        started = time.perf_counter()
+        db.execute(text("SELECT 1"))
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        return {"status": "healthy", "database": "connected", "latency_ms": latency_ms, "pool": pools, "cache": caches, "slot_events": streams}
     except Exception as e:
-        return {"status": "unhealthy", "database": "disconnected", "error": str(e)} 
\ No newline at end of file
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unhealthy", "database": "disconnected", "error": str(e), "pool": pools, "cache": caches, "slot_events": streams}
+        )
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Request and SQL metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Time, Date, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Time, Date, Enum, Index, text
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 import enum
@@ -8,6 +8,22 @@ class UserRole(str, enum.Enum):
     DOCTOR = "doctor"
     PATIENT = "patient"
 
+class AppointmentStatus(str, enum.Enum):
+    SCHEDULED = "scheduled"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+def appointment_status_type() -> Enum:
+    # Stored as the lowercase values (which the partial indexes compare against),
+    # in a VARCHAR with a CHECK constraint rather than a native database enum
+    return Enum(
+        AppointmentStatus,
+        name="appointment_status",
+        native_enum=False,
+        create_constraint=True,
+        values_callable=lambda statuses: [status.value for status in statuses]
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -17,6 +33,8 @@ class User(Base):
     full_name = Column(String)
     role = Column(Enum(UserRole))
     is_active = Column(Boolean, default=True)
+    # Bumped to revoke every calendar feed token issued to the doctor so far
+    calendar_token_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
     
     doctor_availability = relationship("DoctorAvailability", back_populates="doctor")
     appointments_as_doctor = relationship("Appointment", back_populates="doctor", foreign_keys="Appointment.doctor_id")
@@ -24,6 +42,10 @@ class User(Base):
 
 class DoctorAvailability(Base):
     __tablename__ = "doctor_availability"
+    __table_args__ = (
+        # Weekly availability lookups by doctor and day
+        Index("ix_doctor_availability_doctor_id_day_of_week", "doctor_id", "day_of_week"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     doctor_id = Column(Integer, ForeignKey("users.id"))
@@ -35,6 +57,33 @@ class DoctorAvailability(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Appointment listings and date range lookups for a doctor
+        Index("ix_appointments_doctor_id_date_status", "doctor_id", "appointment_date", "status"),
+        # Appointment listings for a patient
+        Index("ix_appointments_patient_id_date", "patient_id", "appointment_date"),
+        # Slot availability and booking conflict checks only look at active appointments
+        Index(
+            "ix_appointments_active_date_doctor_id",
+            "appointment_date", "doctor_id", "start_time", "end_time",
+            postgresql_where=text("status <> 'cancelled'"),
+            sqlite_where=text("status <> 'cancelled'")
+        ),
+        # At most one active appointment can claim a doctor's slot, which makes
+        # the booking insert itself the conflict check
+        Index(
+            "uq_appointments_active_slot",
+            "doctor_id", "appointment_date", "start_time",
+            unique=True,
+            postgresql_where=text("status <> 'cancelled'"),
+            sqlite_where=text("status <> 'cancelled'")
+        ),
+        # Change feeds: a doctor's or patient's appointments in change order
+        Index("ix_appointments_doctor_id_updated_at_id", "doctor_id", "updated_at", "id"),
+        Index("ix_appointments_patient_id_updated_at_id", "patient_id", "updated_at", "id"),
+        # The archival job picks the oldest appointments in batches
+        Index("ix_appointments_date_id", "appointment_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     doctor_id = Column(Integer, ForeignKey("users.id"))
@@ -42,8 +91,74 @@ class Appointment(Base):
     appointment_date = Column(Date)
     start_time = Column(Time)
     end_time = Column(Time)
-    status = Column(String)  # 'scheduled', 'completed', 'cancelled'
+    status = Column(appointment_status_type(), nullable=False, default=AppointmentStatus.SCHEDULED)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set on insert and on every update, including status changes
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     doctor = relationship("User", foreign_keys=[doctor_id], back_populates="appointments_as_doctor")
-    patient = relationship("User", foreign_keys=[patient_id], back_populates="appointments_as_patient") 
\ No newline at end of file
+    patient = relationship("User", foreign_keys=[patient_id], back_populates="appointments_as_patient")
+
+class Slot(Base):
+    """
+    A bookable slot of a doctor on a specific date, materialized from the
+    weekly availability for a rolling horizon (see app.utils.slot_table)
+    """
+    __tablename__ = "slots"
+    __table_args__ = (
+        # A doctor's slots for a date or range, and the booking claim
+        Index("uq_slots_doctor_id_date_start_time", "doctor_id", "slot_date", "start_time", unique=True),
+        # Earliest free slots across all doctors
+        Index("ix_slots_date_start_time", "slot_date", "start_time"),
+        # Removing the slots of a deleted availability window
+        Index("ix_slots_availability_id", "availability_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    availability_id = Column(Integer, ForeignKey("doctor_availability.id"), nullable=False)
+    slot_date = Column(Date, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    is_available = Column(Boolean, nullable=False, default=True)
+
+class ArchivedAppointment(Base):
+    """
+    Appointments dated before the archive cutoff, moved out of `appointments`
+    by app.utils.archive so that booking and slot lookups only ever touch
+    recent and upcoming rows. Archived appointments keep their id and are
+    read-only.
+    """
+    __tablename__ = "appointments_archive"
+    __table_args__ = (
+        # Appointment listings for a doctor or a patient
+        Index("ix_appointments_archive_doctor_id_date", "doctor_id", "appointment_date", "start_time", "id"),
+        Index("ix_appointments_archive_patient_id_date", "patient_id", "appointment_date", "start_time", "id"),
+        # Restoring rows after the archive cutoff was moved back
+        Index("ix_appointments_archive_date", "appointment_date"),
+        # The change feed's archived entries, in (archived_at, id) order
+        Index("ix_appointments_archive_doctor_id_archived_at_id", "doctor_id", "archived_at", "id"),
+        Index("ix_appointments_archive_patient_id_archived_at_id", "patient_id", "archived_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    doctor_id = Column(Integer, ForeignKey("users.id"))
+    patient_id = Column(Integer, ForeignKey("users.id"))
+    appointment_date = Column(Date)
+    start_time = Column(Time)
+    end_time = Column(Time)
+    status = Column(appointment_status_type(), nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class JobLease(Base):
+    """
+    Which worker currently runs a periodic job, so that a job started by every
+    worker process does its work in only one of them at a time
+    """
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,26 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date, timedelta
-from app.database.database import get_db
-from app.models.models import Appointment, User
-from app.schemas.schemas import AppointmentCreate, Appointment as AppointmentSchema, AppointmentUpdate, AvailabilityDate
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from itertools import islice
+import csv
+import heapq
+import io
+import json
+import time
+from app.database.database import get_db, get_session, db_route, run_db, release_db, SessionLocal
+from app.models.models import Appointment, AppointmentStatus, ArchivedAppointment, User
+from app.schemas.schemas import AppointmentCreate, Appointment as AppointmentSchema, AppointmentChanges, AppointmentUpdate, AvailabilityDate, NextAvailableSlot
 from app.utils.auth import get_current_active_user
-from app.utils.schedule import get_doctor_available_slots, book_appointment
+from app.settings import get_settings
+from app.utils.etag import make_etag, etag_matches, not_modified, set_etag
+from app.utils.pagination import encode_cursor, decode_cursor, encode_change_cursor, decode_change_cursor
+from app.utils.serialization import FAST_RESPONSES, fast_response, rows_to_dicts, schema_columns
+from app.utils.slot_cache import slot_cache
+from app.utils.slot_events import RESYNC, SubscriberLimitError, slot_events
+from app.utils import archive, slot_table
+from app.utils.schedule import get_doctor_available_slots, get_doctor_available_slots_range, find_next_available_slots, book_appointment, is_slot_conflict, SlotUnavailableError
 
 router = APIRouter(
     prefix="/appointments",
     tags=["appointments"]
 )
 
+# Maximum number of days that can be requested in a single slot range query
+MAX_SLOT_RANGE_DAYS = 62
+
+# Bounds for the next available appointment search
+MAX_NEXT_AVAILABLE_LIMIT = 50
+MAX_NEXT_AVAILABLE_HORIZON_DAYS = 90
+
+# Page size bounds for appointment listings
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Columns selected for appointment listings on the fast response path, per table
+APPOINTMENT_FIELDS, APPOINTMENT_COLUMNS = schema_columns(AppointmentSchema, Appointment)
+LISTING_COLUMNS = {
+    Appointment: APPOINTMENT_COLUMNS,
+    ArchivedAppointment: schema_columns(AppointmentSchema, ArchivedAppointment)[1],
+}
+
+# Columns written by the appointment export and rows fetched per database round trip
+EXPORT_COLUMNS = ["id", "doctor_id", "patient_id", "appointment_date", "start_time", "end_time", "status", "created_at"]
+EXPORT_BATCH_SIZE = 1000
+
+# Changes younger than this are not served yet by the change feed
+CHANGE_FEED_SETTLE_SECONDS = get_settings().change_feed_settle_seconds
+
+# Slot event streams: seconds between keepalive comments, and maximum stream lifetime
+SLOT_EVENTS_KEEPALIVE = get_settings().slot_events_keepalive
+SLOT_EVENTS_MAX_SECONDS = get_settings().slot_events_max_seconds
+
 @router.get("/doctor/{doctor_id}/slots", response_model=AvailabilityDate)
+@db_route
 def get_available_slots(
     doctor_id: int,
+    request: Request,
+    response: Response,
     date: date = Query(..., description="Date to check for available slots"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Get available appointment slots for a doctor on a specific date"""
+    # Answer revalidations from the version markers alone, before any query
+    etag = make_etag(
+        "slots", doctor_id, date, slot_cache.directory_version(), slot_cache.schedule_version(doctor_id, date)
+    ) if slot_cache.etags_enabled else None
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
     # Check if the doctor exists
     doctor = db.query(User).filter(User.id == doctor_id, User.role == "doctor").first()
     if not doctor:
@@ -30,9 +86,148 @@ def get_available_slots(
         )
     
     # Get available slots
-    return get_doctor_available_slots(db, doctor_id, date)
+    set_etag(response, etag)
+    slots = get_doctor_available_slots(db, doctor_id, date)
+    if FAST_RESPONSES:
+        return fast_response(request, slots, response)
+    return slots
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+@router.get("/doctor/{doctor_id}/slots/events")
+async def stream_slot_events(
+    doctor_id: int,
+    date: date = Query(..., description="Date to follow"),
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Stream a doctor's slots on a date as Server-Sent Events, instead of polling
+    the slots endpoint. The stream starts with a `snapshot` event holding the
+    full AvailabilityDate, followed by a `slot` event for every booking or
+    cancellation; another `snapshot` is sent whenever the doctor's availability
+    changes or the client fell too far behind. The server ends the stream after
+    a few minutes and the client reconnects.
+    """
+    def load_snapshot(session: Session):
+        doctor = session.query(User.id).filter(User.id == doctor_id, User.role == "doctor").first()
+        if not doctor:
+            return None
+        return get_doctor_available_slots(session, doctor_id, date).model_dump_json()
+    
+    async def snapshot():
+        try:
+            return await run_db(db, load_snapshot)
+        finally:
+            # Idle streams must not hold on to a pooled connection
+            await release_db(db)
+    
+    try:
+        subscription = slot_events.subscribe(doctor_id, date)
+    except SubscriberLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    
+    # Subscribed before reading the snapshot, so no change in between is lost
+    try:
+        initial = await snapshot()
+    except BaseException:
+        slot_events.unsubscribe(subscription)
+        raise
+    if initial is None:
+        slot_events.unsubscribe(subscription)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found"
+        )
+    
+    async def events():
+        deadline = time.monotonic() + SLOT_EVENTS_MAX_SECONDS
+        try:
+            yield "retry: 1000\n" + _sse("snapshot", initial)
+            while (remaining := deadline - time.monotonic()) > 0:
+                event = await subscription.get(timeout=min(SLOT_EVENTS_KEEPALIVE, remaining))
+                if event is None:
+                    yield ": keepalive\n\n"
+                elif event is RESYNC:
+                    yield _sse("snapshot", await snapshot())
+                else:
+                    yield _sse("slot", json.dumps(event))
+        finally:
+            slot_events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/doctor/{doctor_id}/slots/range", response_model=List[AvailabilityDate])
+@db_route
+def get_available_slots_range(
+    doctor_id: int,
+    request: Request,
+    start_date: date = Query(..., description="First date to check for available slots"),
+    end_date: date = Query(..., description="Last date to check for available slots (inclusive)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get available appointment slots for a doctor for every date in a range"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
+        )
+    
+    if (end_date - start_date).days + 1 > MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range cannot exceed {MAX_SLOT_RANGE_DAYS} days"
+        )
+    
+    # Check if the doctor exists
+    doctor = db.query(User).filter(User.id == doctor_id, User.role == "doctor").first()
+    if not doctor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found"
+        )
+    
+    # Get available slots for the whole range
+    slots = get_doctor_available_slots_range(db, doctor_id, start_date, end_date)
+    if FAST_RESPONSES:
+        return fast_response(request, slots)
+    return slots
+
+@router.get("/next-available", response_model=List[NextAvailableSlot])
+@db_route
+def get_next_available_slots(
+    request: Request,
+    start_date: Optional[date] = Query(None, description="Date to start searching from (defaults to today)"),
+    limit: int = Query(10, ge=1, le=MAX_NEXT_AVAILABLE_LIMIT, description="Number of slots to return"),
+    horizon_days: int = Query(14, ge=1, le=MAX_NEXT_AVAILABLE_HORIZON_DAYS, description="Number of days to search"),
+    doctor_ids: Optional[List[int]] = Query(None, description="Restrict the search to these doctors"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the earliest available appointment slots across all doctors"""
+    slots = find_next_available_slots(
+        db,
+        start_date=start_date or date.today(),
+        limit=limit,
+        horizon_days=horizon_days,
+        doctor_ids=doctor_ids
+    )
+    if FAST_RESPONSES:
+        return fast_response(request, slots)
+    return slots
 
 @router.post("/", response_model=AppointmentSchema)
+@db_route
 def create_appointment(
     appointment: AppointmentCreate,
     db: Session = Depends(get_db),
@@ -55,47 +250,241 @@ def create_appointment(
             start_time=appointment.start_time
         )
         return new_appointment
+    except SlotUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
+def user_appointments_query(
+    db: Session,
+    current_user: User,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    model=Appointment
+):
+    """Appointments of the current user in `model`'s table, optionally limited to a date range"""
+    if current_user.role == "doctor":
+        query = db.query(model).filter(model.doctor_id == current_user.id)
+    else:  # patient
+        query = db.query(model).filter(model.patient_id == current_user.id)
+    
+    # Apply date filters if provided
+    if start_date:
+        query = query.filter(model.appointment_date >= start_date)
+    
+    if end_date:
+        query = query.filter(model.appointment_date <= end_date)
+    
+    return query
+
+def appointment_tables(start_date: Optional[date]) -> list:
+    """The tables holding the current user's appointments dated on or after `start_date`"""
+    if archive.reaches_archive(start_date):
+        return [ArchivedAppointment, Appointment]
+    return [Appointment]
+
 @router.get("/", response_model=List[AppointmentSchema])
+@db_route
 def get_user_appointments(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     start_date: date = Query(None, description="Filter by start date"),
-    end_date: date = Query(None, description="Filter by end date")
+    end_date: date = Query(None, description="Filter by end date"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of appointments to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header value from the previous page")
 ):
-    """Get all appointments for the current user"""
-    query = None
+    """
+    Get the appointments for the current user, one page at a time.
+    When more appointments follow, the X-Next-Cursor response header holds the
+    cursor for the next page. Ranges reaching back past the archive cutoff
+    are read from the archive as well.
+    """
+    # Keyset pagination: continue after the last appointment of the previous page
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
+    # The archive only matters while the page can still start before the cutoff
+    earliest = start_date
+    if after and (earliest is None or after[0] > earliest):
+        earliest = after[0]
+    appointments = []
+    for model in appointment_tables(earliest):
+        query = user_appointments_query(db, current_user, start_date, end_date, model)
+        if after:
+            query = query.filter(tuple_(model.appointment_date, model.start_time, model.id) > tuple_(*after))
+        
+        # Plain rows of the response columns are enough for the fast path
+        if FAST_RESPONSES:
+            query = query.with_entities(*LISTING_COLUMNS[model])
+        
+        # Order by date and time, fetching one extra row to know if another page follows
+        appointments += query.order_by(
+            model.appointment_date, model.start_time, model.id
+        ).limit(limit + 1).all()
+    appointments.sort(key=archive.appointment_order)
     
+    if len(appointments) > limit:
+        appointments = appointments[:limit]
+        last = appointments[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.appointment_date, last.start_time, last.id)
+    
+    if FAST_RESPONSES:
+        return fast_response(request, rows_to_dicts(APPOINTMENT_FIELDS, appointments), response)
+    return appointments
+
+@router.get("/changes", response_model=AppointmentChanges)
+@db_route
+def get_appointment_changes(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous response; omit to start from the beginning"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of changes to return")
+):
+    """
+    Get the current user's appointments that were created or changed after
+    the cursor, oldest change first, and the ids of those moved to the
+    archive since. Keep the returned next_cursor and pass it on the next call
+    to receive only what changed since; request again right away while
+    has_more is true.
+    """
     if current_user.role == "doctor":
         query = db.query(Appointment).filter(Appointment.doctor_id == current_user.id)
+        archived_query = db.query(ArchivedAppointment.id, ArchivedAppointment.archived_at).filter(
+            ArchivedAppointment.doctor_id == current_user.id
+        )
     else:  # patient
         query = db.query(Appointment).filter(Appointment.patient_id == current_user.id)
+        archived_query = db.query(ArchivedAppointment.id, ArchivedAppointment.archived_at).filter(
+            ArchivedAppointment.patient_id == current_user.id
+        )
     
-    # Apply date filters if provided
-    if start_date:
-        query = query.filter(Appointment.appointment_date >= start_date)
+    if cursor:
+        try:
+            after = decode_change_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        query = query.filter(tuple_(Appointment.updated_at, Appointment.id) > tuple_(*after))
+        archived_query = archived_query.filter(
+            tuple_(ArchivedAppointment.archived_at, ArchivedAppointment.id) > tuple_(*after)
+        )
     
-    if end_date:
-        query = query.filter(Appointment.appointment_date <= end_date)
+    # Hold back the newest changes: a transaction that stamped an earlier
+    # updated_at may not have committed yet, and the cursor would skip it
+    settled = datetime.utcnow() - timedelta(seconds=CHANGE_FEED_SETTLE_SECONDS)
+    changes = query.filter(Appointment.updated_at <= settled).order_by(
+        Appointment.updated_at, Appointment.id
+    ).limit(limit + 1).all()
+    archived = archived_query.filter(ArchivedAppointment.archived_at <= settled).order_by(
+        ArchivedAppointment.archived_at, ArchivedAppointment.id
+    ).limit(limit + 1).all()
     
-    # Order by date and time
-    appointments = query.order_by(Appointment.appointment_date, Appointment.start_time).all()
+    # Both tables share the cursor: an archived appointment is ordered by when
+    # it was archived, as that is when it left the hot table
+    entries = list(islice(heapq.merge(
+        [((row.updated_at, row.id), row) for row in changes],
+        [((row.archived_at, row.id), None) for row in archived],
+        key=lambda entry: entry[0]
+    ), limit + 1))
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if entries:
+        cursor = encode_change_cursor(*entries[-1][0])
     
-    return appointments
+    return AppointmentChanges(
+        changes=[row for _, row in entries if row is not None],
+        archived=[key[1] for key, row in entries if row is None],
+        next_cursor=cursor,
+        has_more=has_more
+    )
+
+def _export_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+@router.get("/export")
+def export_user_appointments(
+    current_user: User = Depends(get_current_active_user),
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    start_date: date = Query(None, description="Filter by start date"),
+    end_date: date = Query(None, description="Filter by end date")
+):
+    """
+    Stream all appointments of the current user, archived ones included, as
+    NDJSON or CSV. Rows are read from server-side cursors in batches, so
+    memory use stays flat regardless of how much history is exported.
+    """
+    def batches():
+        # The stream outlives the request's dependencies, so it owns its session
+        with SessionLocal() as db:
+            queries = [
+                user_appointments_query(db, current_user, start_date, end_date, model).with_entities(
+                    *[getattr(model, column) for column in EXPORT_COLUMNS]
+                ).order_by(
+                    model.appointment_date, model.start_time, model.id
+                ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+                for model in appointment_tables(start_date)
+            ]
+            
+            batch = []
+            for row in heapq.merge(*queries, key=archive.appointment_order):
+                batch.append([_export_value(value) for value in row])
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+    
+    def ndjson():
+        for batch in batches():
+            yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in batch)
+    
+    def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in batches():
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    if export_format == "csv":
+        return StreamingResponse(
+            csv_rows(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="appointments.csv"'}
+        )
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 @router.get("/{appointment_id}", response_model=AppointmentSchema)
+@db_route
 def get_appointment(
     appointment_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get a specific appointment"""
+    """Get a specific appointment, archived or not"""
     appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    if not appointment:
+        appointment = db.query(ArchivedAppointment).filter(ArchivedAppointment.id == appointment_id).first()
     
     if not appointment:
         raise HTTPException(
@@ -114,6 +503,7 @@ def get_appointment(
     return appointment
 
 @router.patch("/{appointment_id}", response_model=AppointmentSchema)
+@db_route
 def update_appointment_status(
     appointment_id: int,
     update_data: AppointmentUpdate,
@@ -124,6 +514,12 @@ def update_appointment_status(
     appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
     
     if not appointment:
+        # Archived appointments are history and can no longer change
+        if db.query(ArchivedAppointment.id).filter(ArchivedAppointment.id == appointment_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Archived appointments cannot be changed"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found"
@@ -138,16 +534,44 @@ def update_appointment_status(
         )
     
     # Validate the status value
-    valid_statuses = ["scheduled", "completed", "cancelled"]
+    valid_statuses = [appointment_status.value for appointment_status in AppointmentStatus]
     if update_data.status not in valid_statuses:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Status must be one of: {', '.join(valid_statuses)}"
         )
     
-    # Update the appointment
-    appointment.status = update_data.status
-    db.commit()
+    # Update the appointment, freeing or re-claiming its materialized slot
+    previous_status = appointment.status
+    appointment.status = AppointmentStatus(update_data.status)
+    if not slot_table.sync_appointment_slot(db, appointment, previous_status):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This time slot is already booked"
+        )
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if not is_slot_conflict(e):
+            raise
+        # Re-activating a cancelled appointment whose slot has been booked again
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This time slot is already booked"
+        )
     db.refresh(appointment)
     
+    # Cancelling (or re-activating) an appointment changes the doctor's slots for that date
+    slot_cache.invalidate_date(appointment.doctor_id, appointment.appointment_date)
+    if (previous_status == AppointmentStatus.CANCELLED) != (appointment.status == AppointmentStatus.CANCELLED):
+        slot_events.publish_slot(
+            appointment.doctor_id,
+            appointment.appointment_date,
+            appointment.start_time,
+            appointment.end_time,
+            is_available=appointment.status == AppointmentStatus.CANCELLED
+        )
+    
     return appointment 
\ No newline at end of file
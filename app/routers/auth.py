@@ -2,20 +2,40 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from app.database.database import get_db
+from app.database.database import get_session, run_db
 from app.models.models import User
 from app.schemas.schemas import UserCreate, User as UserSchema, Token
-from app.utils.auth import authenticate_user, create_access_token, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.utils.auth import authenticate_user_async, create_access_token, get_user_by_email, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.utils.hashing import hash_password_async, PasswordHashPoolBusy
 
 router = APIRouter(tags=["authentication"])
 
+def password_pool_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+def _create_user(db: Session, db_user: User):
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+# Password hashing is CPU bound, so these routes are async and hand bcrypt to the
+# password hashing pool instead of tying up FastAPI's threadpool
 @router.post("/register", response_model=UserSchema)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register_user(user: UserCreate, db: Session = Depends(get_session)):
+    db_user = await run_db(db, get_user_by_email, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await hash_password_async(user.password)
+    except PasswordHashPoolBusy:
+        raise password_pool_busy_exception()
+    
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -23,14 +43,14 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role,
         is_active=True
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return await run_db(db, _create_user, db_user)
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
+    try:
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
+    except PasswordHashPoolBusy:
+        raise password_pool_busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.database.database import get_db
+from typing import List, Optional
+from app.database.database import get_db, db_route
 from app.models.models import DoctorAvailability
-from app.schemas.schemas import DoctorAvailabilityCreate, DoctorAvailability as DoctorAvailabilitySchema
+from app.schemas.schemas import DoctorAvailabilityCreate, DoctorAvailability as DoctorAvailabilitySchema, DoctorAvailabilityBulkCreate, AvailabilityImportResult
 from app.utils.auth import get_current_active_user, get_doctor_user
 from app.models.models import User
+from app.utils.availability import AvailabilityWindow, AvailabilityImportError, bulk_create_availability
+from app.utils.etag import make_etag, etag_matches, not_modified, set_etag
+from app.utils.serialization import FAST_RESPONSES, fast_response, rows_to_dicts, schema_columns
+from app.utils.slot_cache import slot_cache
+from app.utils.slot_events import slot_events
+from app.utils import slot_table
 
 router = APIRouter(
     prefix="/availability",
     tags=["availability"]
 )
 
+AVAILABILITY_FIELDS, AVAILABILITY_COLUMNS = schema_columns(DoctorAvailabilitySchema, DoctorAvailability)
+
 @router.post("/", response_model=DoctorAvailabilitySchema)
+@db_route
 def create_availability(
     availability: DoctorAvailabilityCreate,
     db: Session = Depends(get_db),
@@ -46,11 +55,36 @@ def create_availability(
     )
     
     db.add(db_availability)
+    db.flush()
+    slot_table.materialize_horizon(db, availability_ids=[db_availability.id])
     db.commit()
+    slot_cache.invalidate_doctor(current_user.id)
+    slot_events.publish_resync(current_user.id)
     db.refresh(db_availability)
     return db_availability
 
+@router.post("/bulk", response_model=AvailabilityImportResult)
+@db_route
+def create_availability_bulk(
+    template: DoctorAvailabilityBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_doctor_user)
+):
+    """Create a whole weekly availability template for the doctor in one transaction"""
+    windows = [
+        AvailabilityWindow(current_user.id, window.day_of_week, window.start_time, window.end_time)
+        for window in template.windows
+    ]
+    try:
+        return bulk_create_availability(db, windows, replace_existing=template.replace_existing)
+    except AvailabilityImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.errors
+        )
+
 @router.get("/", response_model=List[DoctorAvailabilitySchema])
+@db_route
 def get_doctor_availabilities(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_doctor_user)
@@ -63,12 +97,23 @@ def get_doctor_availabilities(
     return availabilities
 
 @router.get("/{doctor_id}", response_model=List[DoctorAvailabilitySchema])
+@db_route
 def get_specific_doctor_availabilities(
     doctor_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Get all availability slots for a specific doctor"""
+    # Answer revalidations from the version markers alone, before any query
+    etag = make_etag(
+        "availability", doctor_id, slot_cache.directory_version(), slot_cache.schedule_version(doctor_id)
+    ) if slot_cache.etags_enabled else None
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
     # Check if the doctor exists
     doctor = db.query(User).filter(User.id == doctor_id, User.role == "doctor").first()
     if not doctor:
@@ -79,11 +124,17 @@ def get_specific_doctor_availabilities(
     
     availabilities = db.query(DoctorAvailability).filter(
         DoctorAvailability.doctor_id == doctor_id
-    ).all()
+    )
     
-    return availabilities
+    set_etag(response, etag)
+    if FAST_RESPONSES:
+        return fast_response(
+            request, rows_to_dicts(AVAILABILITY_FIELDS, availabilities.with_entities(*AVAILABILITY_COLUMNS)), response
+        )
+    return availabilities.all()
 
 @router.delete("/{availability_id}", status_code=status.HTTP_204_NO_CONTENT)
+@db_route
 def delete_availability(
     availability_id: int,
     db: Session = Depends(get_db),
@@ -101,7 +152,10 @@ def delete_availability(
             detail="Availability not found or not owned by you"
         )
     
+    slot_table.delete_slots(db, availability_ids=[availability_id])
     db.delete(db_availability)
     db.commit()
+    slot_cache.invalidate_doctor(current_user.id)
+    slot_events.publish_resync(current_user.id)
     
     return None 
\ No newline at end of file
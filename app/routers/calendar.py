@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database.database import SessionLocal, get_db, db_route
+from app.models.models import User
+from app.schemas.schemas import CalendarFeed
+from app.utils.auth import get_doctor_user, create_calendar_token, verify_calendar_token
+from app.utils.etag import make_etag, etag_matches, not_modified, CACHE_CONTROL
+from app.utils.ical import calendar_cache, stream_feed
+from app.utils.slot_cache import slot_cache
+
+router = APIRouter(
+    prefix="/calendar",
+    tags=["calendar"]
+)
+
+CALENDAR_MEDIA_TYPE = "text/calendar"
+
+def _calendar_feed(request: Request, doctor_id: int, version: int) -> CalendarFeed:
+    token = create_calendar_token(doctor_id, version)
+    url = request.url_for("get_doctor_calendar", doctor_id=doctor_id).include_query_params(token=token)
+    return CalendarFeed(token=token, url=str(url))
+
+@router.get("/token", response_model=CalendarFeed)
+@db_route
+def get_calendar_feed(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_doctor_user)
+):
+    """Get the calendar subscription URL for the current doctor"""
+    version = db.query(User.calendar_token_version).filter(User.id == current_user.id).scalar()
+    return _calendar_feed(request, current_user.id, version)
+
+@router.post("/token", response_model=CalendarFeed)
+@db_route
+def reissue_calendar_feed(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_doctor_user)
+):
+    """
+    Issue a new calendar subscription URL for the current doctor, e.g. after
+    the old one leaked. Every previously issued URL stops working.
+    """
+    db.query(User).filter(User.id == current_user.id).update(
+        {User.calendar_token_version: User.calendar_token_version + 1}, synchronize_session=False
+    )
+    db.commit()
+    version = db.query(User.calendar_token_version).filter(User.id == current_user.id).scalar()
+    return _calendar_feed(request, current_user.id, version)
+
+@router.get("/doctors/{doctor_id}.ics")
+def get_doctor_calendar(
+    doctor_id: int,
+    token: str = Query(..., description="Token from /calendar/token"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get a doctor's upcoming and past appointments as an iCalendar feed for
+    calendar clients. Clients polling with If-None-Match get a 304 after a
+    single lookup of the doctor until one of the doctor's appointments changes.
+    """
+    claims = verify_calendar_token(token)
+    if claims is None or claims[0] != doctor_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid calendar token"
+        )
+    
+    # Checked on every request, so a re-issued token revokes the old one in every worker
+    with SessionLocal() as db:
+        doctor = db.query(User.full_name, User.calendar_token_version).filter(
+            User.id == doctor_id, User.role == "doctor", User.is_active == True
+        ).first()
+    if not doctor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found"
+        )
+    if doctor.calendar_token_version != claims[1]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid calendar token"
+        )
+    
+    version = (slot_cache.directory_version(), slot_cache.appointments_version(doctor_id))
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if slot_cache.etags_enabled:
+        etag = make_etag("calendar", doctor_id, *version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        headers["ETag"] = etag
+    
+    # Rendered feeds are only cached while the version markers see every write
+    cache_key = None
+    if slot_cache.etags_enabled:
+        cache_key = (doctor_id, version)
+        cached = calendar_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached, media_type=CALENDAR_MEDIA_TYPE, headers=headers)
+    
+    def feed():
+        # The stream outlives the request, so it owns its session
+        with SessionLocal() as db:
+            yield from stream_feed(db, doctor_id, doctor.full_name, cache_key)
+    
+    return StreamingResponse(feed(), media_type=CALENDAR_MEDIA_TYPE, headers=headers)
@@ -1,31 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, db_route
 from app.models.models import User
 from app.schemas.schemas import User as UserSchema
 from app.utils.auth import get_current_active_user
-from typing import List
+from app.utils.etag import make_etag, etag_matches, not_modified, set_etag
+from app.utils.serialization import FAST_RESPONSES, fast_response, rows_to_dicts, schema_columns
+from app.utils.slot_cache import slot_cache
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/users",
     tags=["users"]
 )
 
+USER_FIELDS, USER_COLUMNS = schema_columns(UserSchema, User)
+
 @router.get("/me", response_model=UserSchema)
 def read_users_me(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
     return current_user
 
 @router.get("/doctors", response_model=List[UserSchema])
+@db_route
 def get_all_doctors(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Get all doctors"""
-    doctors = db.query(User).filter(User.role == "doctor", User.is_active == True).all()
-    return doctors
+    etag = make_etag("doctors", slot_cache.directory_version()) if slot_cache.etags_enabled else None
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    doctors = db.query(User).filter(User.role == "doctor", User.is_active == True)
+    if FAST_RESPONSES:
+        return fast_response(request, rows_to_dicts(USER_FIELDS, doctors.with_entities(*USER_COLUMNS)), response)
+    return doctors.all()
 
 @router.get("/{user_id}", response_model=UserSchema)
+@db_route
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
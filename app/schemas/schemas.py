@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr, validator, Field
 from typing import Optional, List
 from datetime import date, time, datetime
-from app.models.models import UserRole
+from app.models.models import AppointmentStatus, UserRole
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -58,6 +58,15 @@ class DoctorAvailability(DoctorAvailabilityBase):
     class Config:
         from_attributes = True
 
+class DoctorAvailabilityBulkCreate(BaseModel):
+    windows: List[DoctorAvailabilityCreate] = Field(..., max_length=500)
+    replace_existing: bool = False
+
+class AvailabilityImportResult(BaseModel):
+    doctors: int
+    created: int
+    replaced: int
+
 class TimeSlot(BaseModel):
     start_time: time
     end_time: time
@@ -67,6 +76,13 @@ class AvailabilityDate(BaseModel):
     date: date
     time_slots: List[TimeSlot]
 
+class NextAvailableSlot(BaseModel):
+    doctor_id: int
+    doctor_name: str
+    date: date
+    start_time: time
+    end_time: time
+
 class AppointmentBase(BaseModel):
     doctor_id: int
     appointment_date: date
@@ -79,11 +95,24 @@ class Appointment(AppointmentBase):
     id: int
     patient_id: int
     end_time: time
-    status: str
+    status: AppointmentStatus
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class AppointmentChanges(BaseModel):
+    changes: List[Appointment]
+    # Ids of appointments moved to the archive since the cursor; drop them locally
+    archived: List[int] = []
+    # Pass back as `cursor` to get the changes made after these
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+class CalendarFeed(BaseModel):
+    token: str
+    url: str
+
 class AppointmentUpdate(BaseModel):
     status: str 
\ No newline at end of file
@@ -0,0 +1,86 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+class Settings(BaseSettings):
+    """
+    Application settings, read once from environment variables (or the
+    project's .env file) and validated by type. Field names match the
+    environment variable names, e.g. `db_pool_size` reads DB_POOL_SIZE.
+    """
+    model_config = SettingsConfigDict(env_file=PROJECT_ROOT / ".env", extra="ignore")
+
+    # Database
+    database_url: Optional[str] = None
+    async_database_url: Optional[str] = None
+    # "sync" runs database work in FastAPI's threadpool, "async" on the event loop
+    db_mode: Literal["sync", "async"] = "sync"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # At startup: "migrations" requires the database to be at the Alembic head,
+    # "create" creates missing tables (development and tests), "off" skips the check
+    schema_check: Literal["migrations", "create", "off"] = "migrations"
+
+    # Authentication
+    secret_key: Optional[str] = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    user_cache_ttl: float = 60
+    user_cache_size: int = 10000
+
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+
+    # Slots
+    slot_engine: Literal["sweep", "bitmap"] = "sweep"
+    slot_cache_size: int = 10000
+    slot_cache_ttl: float = 300
+    # Whether the app runs as one worker process. Only then are the in-process
+    # version markers authoritative enough to answer If-None-Match with 304
+    single_worker: bool = False
+    # "rules" derives slots from the weekly availability on every read, "table"
+    # serves the next slot_horizon_days days from the materialized slots table
+    slot_store: Literal["rules", "table"] = "rules"
+    slot_horizon_days: int = 56
+
+    # Slot event streams (per worker)
+    slot_events_max_subscribers: int = 1000
+    slot_events_queue_size: int = 64
+    slot_events_keepalive: float = 15
+    # Streams end after this long and the client reconnects, which keeps
+    # connections spread across workers and under proxy timeouts
+    slot_events_max_seconds: float = 300
+
+    # Appointment changes younger than this are held back from the change feed,
+    # so transactions still committing cannot be skipped by a cursor
+    change_feed_settle_seconds: float = 5
+
+    # Appointments dated more than this many days ago are moved to the archive
+    # table by a job that runs this many seconds after startup and after every
+    # midnight, in one worker at a time
+    appointment_archive_after_days: int = 365
+    appointment_archive_job: bool = True
+    appointment_archive_start_delay: float = 60
+
+    # Rendered iCalendar feeds; feeds larger than the byte limit are streamed but not cached
+    calendar_cache_size: int = 500
+    calendar_cache_ttl: float = 300
+    calendar_cache_max_feed_bytes: int = 1_000_000
+
+    metrics_enabled: bool = True
+    # Encode large list responses with pydantic-core (and optionally MessagePack)
+    # straight from selected columns, skipping response_model re-validation
+    fast_responses: bool = False
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
@@ -0,0 +1,166 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+import argparse
+import asyncio
+import logging
+import sys
+
+from sqlalchemy import DateTime, delete, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.models import Appointment, ArchivedAppointment
+from app.settings import get_settings
+from app.utils.leases import acquire_lease
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = max(1, get_settings().appointment_archive_after_days)
+ARCHIVE_JOB_ENABLED = get_settings().appointment_archive_job
+ARCHIVE_JOB_START_DELAY = max(0.0, get_settings().appointment_archive_start_delay)
+
+# How long the worker running the archival job keeps the others from running it
+ARCHIVE_LEASE_SECONDS = 3600
+
+# Appointments moved per transaction
+ARCHIVE_BATCH_SIZE = 5000
+
+# Columns shared by the hot and archive tables, copied when rows move between them
+MOVED_COLUMNS = [
+    "id", "doctor_id", "patient_id", "appointment_date", "start_time", "end_time", "status", "created_at", "updated_at"
+]
+
+def archive_cutoff(today: Optional[date] = None) -> date:
+    """Appointments dated before this day belong in the archive"""
+    return (today or date.today()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+def reaches_archive(start_date: Optional[date]) -> bool:
+    """
+    Whether appointments dated on or after `start_date` (None for no lower
+    bound) may include archived ones. Archived rows are always dated before
+    the cutoff: moving the cutoff back restores newer ones with the next run.
+    """
+    return start_date is None or start_date < archive_cutoff()
+
+def appointment_order(row) -> tuple:
+    """Sort key of appointment listings, for rows of either table"""
+    return (row.appointment_date, row.start_time, row.id)
+
+def archive_appointments(db: Session, before: date, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move every appointment dated before `before` into the archive table, one
+    committed batch at a time, so the hot table is never locked for long.
+    Returns the number of appointments moved, counting only committed batches.
+    """
+    moved = 0
+    while True:
+        # Stamped per batch, so the change feed sees each batch close to its commit
+        archived_at = literal(datetime.utcnow(), DateTime)
+        ids = [
+            row.id for row in db.query(Appointment.id).filter(
+                Appointment.appointment_date < before
+            ).order_by(Appointment.appointment_date, Appointment.id).limit(batch_size)
+        ]
+        if not ids:
+            return moved
+        try:
+            db.execute(
+                insert(ArchivedAppointment).from_select(
+                    MOVED_COLUMNS + ["archived_at"],
+                    select(*[getattr(Appointment, column) for column in MOVED_COLUMNS], archived_at).where(
+                        Appointment.id.in_(ids)
+                    )
+                )
+            )
+            db.execute(
+                delete(Appointment).where(Appointment.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except IntegrityError:
+            # Another worker is moving the same rows; the next run picks up the rest
+            db.rollback()
+            return moved
+        moved += len(ids)
+
+def restore_appointments(db: Session, since: date) -> int:
+    """
+    Move archived appointments dated on or after `since` back into the hot
+    table, after the archive cutoff was moved back, in one transaction.
+    Restored appointments count as changed, so the change feed lists them
+    again. Commits; returns the number of appointments restored.
+    """
+    ids = [
+        row.id for row in db.query(ArchivedAppointment.id).filter(ArchivedAppointment.appointment_date >= since)
+    ]
+    if not ids:
+        return 0
+    restored_at = literal(datetime.utcnow(), DateTime)
+    columns = [restored_at if column == "updated_at" else getattr(ArchivedAppointment, column) for column in MOVED_COLUMNS]
+    try:
+        db.execute(
+            insert(Appointment).from_select(
+                MOVED_COLUMNS, select(*columns).where(ArchivedAppointment.id.in_(ids))
+            )
+        )
+        db.execute(
+            delete(ArchivedAppointment).where(ArchivedAppointment.id.in_(ids)).execution_options(
+                synchronize_session=False
+            )
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return 0
+    return len(ids)
+
+def run_archival(db: Session, today: Optional[date] = None) -> dict:
+    """Bring both tables in line with the current cutoff. Commits."""
+    cutoff = archive_cutoff(today)
+    restored = restore_appointments(db, cutoff)
+    archived = archive_appointments(db, cutoff)
+    return {"archived": archived, "restored": restored, "cutoff": cutoff.isoformat()}
+
+async def run_archive_job():
+    """
+    Archive old appointments shortly after startup and then shortly after
+    every midnight, until cancelled. Every worker runs the job, but only the
+    one holding the "archive" lease does the work.
+    """
+    from app.database.database import SessionLocal
+
+    def archive():
+        with SessionLocal() as db:
+            if not acquire_lease(db, "archive", ARCHIVE_LEASE_SECONDS):
+                return None
+            return run_archival(db)
+
+    # Let the worker start serving before the first run
+    await asyncio.sleep(ARCHIVE_JOB_START_DELAY)
+    while True:
+        try:
+            result = await run_in_threadpool(archive)
+            if result is not None:
+                logger.info("Appointments archived: %s", result)
+        except Exception:
+            logger.exception("Archiving appointments failed")
+        tomorrow = datetime.combine(date.today() + timedelta(days=1), time(0, 5))
+        await asyncio.sleep((tomorrow - datetime.now()).total_seconds())
+
+def main() -> int:
+    """Move appointments older than APPOINTMENT_ARCHIVE_AFTER_DAYS to the archive table, e.g. from a daily cron job"""
+    from app.database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.parse_args()
+
+    with SessionLocal() as db:
+        result = run_archival(db)
+    print(
+        f"Archived {result['archived']} and restored {result['restored']} appointments "
+        f"(cutoff {result['cutoff']})"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,57 @@
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.models.models import User
-from app.schemas.schemas import TokenData
-import os
-from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.database.database import get_session, run_db
+from app.models.models import User, UserRole
+from app.schemas.schemas import TokenData, User as UserSchema
+from app.utils.cache import TTLCache
+from app.utils.hashing import verify_and_update_password_async
+from app.utils.slot_cache import slot_cache
+from app.settings import get_settings
+import time
 
-load_dotenv()
+settings = get_settings()
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+
+# Authenticated users are cached by id so a cache hit costs no database query.
+# Changes made through the ORM invalidate the entry in this worker as soon as
+# they are committed; other workers pick them up once USER_CACHE_TTL expires.
+USER_CACHE_TTL = settings.user_cache_ttl
+USER_CACHE_SIZE = settings.user_cache_size
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+token_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
-pwd_context = CryptContext(schemes=["bcrypt", "sha256_crypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def _store_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """
+    Authenticate without blocking the event loop: the lookup goes through run_db and
+    bcrypt through the password hashing pool. Hashes created with outdated settings
+    (e.g. an older bcrypt cost) are transparently replaced on success.
+    """
+    user = await run_db(db, get_user_by_email, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        await run_db(db, _store_password_hash, user, new_hash)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -44,24 +64,104 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_calendar_token(doctor_id: int, version: int = 0) -> str:
+    """
+    Long-lived token for a doctor's calendar feed URL. It carries no `sub`, so
+    it cannot be used as an access token. It is valid while `version` matches
+    the doctor's calendar_token_version, which re-issuing the token bumps.
+    """
+    return jwt.encode({"calendar": doctor_id, "version": version}, SECRET_KEY, algorithm=ALGORITHM)
+
+def verify_calendar_token(token: str) -> Optional[Tuple[int, int]]:
+    """The doctor id and token version a calendar token was issued for, or None if it is invalid"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    doctor_id = payload.get("calendar")
+    # Tokens issued before versions existed count as the first version
+    version = payload.get("version", 0)
+    if not isinstance(doctor_id, int) or not isinstance(version, int):
+        return None
+    return doctor_id, version
+
+def invalidate_user(user_id: int):
+    """Drop a user from the authentication cache after it was changed or deactivated"""
+    user_cache.delete(user_id)
+
+# Cached users are dropped only once the change is committed: dropping them at
+# flush would let a concurrent request re-cache the old row before the commit
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _flag_user_change(mapper, connection, target):
+    object_session(target).info.setdefault("changed_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("changed_user_ids", None)
+
+# The doctor directory version is bumped only once the change is committed, so a
+# reader can never tag data read before the commit with the new version
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _flag_doctor_directory_change(mapper, connection, target):
+    if target.role == UserRole.DOCTOR or UserRole.DOCTOR in inspect(target).attrs.role.history.deleted:
+        object_session(target).info["doctor_directory_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _bump_doctor_directory_version(session):
+    if session.info.pop("doctor_directory_changed", False):
+        slot_cache.invalidate_directory()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_doctor_directory_change(session):
+    session.info.pop("doctor_directory_changed", None)
+
+def decode_access_token(token: str) -> dict:
+    """Decode and verify a token, reusing the claims of recently seen tokens"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        expires_in = payload.get("exp", 0) - time.time()
+        # Never keep a token around past its own expiry
+        token_cache.set(token, payload, ttl=expires_in)
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(email=email, user_id=payload.get("user_id"))
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+    
+    if token_data.user_id is not None:
+        cached_user = user_cache.get(token_data.user_id)
+        if cached_user is not None and cached_user.email == token_data.email:
+            return cached_user
+    
+    # Run the lookup off the event loop (threadpool or AsyncSession, depending on DB_MODE)
+    user = await run_db(db, get_user_by_email, token_data.email)
     if user is None:
         raise credentials_exception
-    return user
+    
+    # Cache a detached snapshot rather than the session-bound ORM object
+    cached_user = UserSchema.model_validate(user)
+    user_cache.set(cached_user.id, cached_user)
+    return cached_user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
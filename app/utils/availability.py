@@ -0,0 +1,174 @@
+from datetime import time
+from typing import Dict, Iterable, List, NamedTuple, Sequence, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from app.models.models import DoctorAvailability, User
+from app.schemas.schemas import DoctorAvailabilityCreate
+from app.utils.slot_cache import slot_cache
+from app.utils.slot_events import slot_events
+from app.utils import slot_table
+import argparse
+import csv
+import sys
+
+# Keep IN (...) lists well below database parameter limits
+QUERY_CHUNK_SIZE = 500
+
+class AvailabilityWindow(NamedTuple):
+    doctor_id: int
+    day_of_week: int
+    start_time: time
+    end_time: time
+
+class AvailabilityImportError(ValueError):
+    """Raised when a bulk import is rejected; `errors` lists every problem found"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def _chunks(values: Sequence, size: int = QUERY_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def find_overlaps(windows: Iterable[AvailabilityWindow]) -> List[str]:
+    """
+    Check windows for overlaps within the same doctor and day, in memory.
+    Windows that only touch (one ends when the next starts) do not overlap.
+    """
+    by_day: Dict[Tuple[int, int], List[AvailabilityWindow]] = {}
+    for window in windows:
+        by_day.setdefault((window.doctor_id, window.day_of_week), []).append(window)
+
+    errors = []
+    for (doctor_id, day_of_week), day_windows in by_day.items():
+        day_windows.sort(key=lambda window: window.start_time)
+        for previous, current in zip(day_windows, day_windows[1:]):
+            if current.start_time < previous.end_time:
+                errors.append(
+                    f"Doctor {doctor_id}, day {day_of_week}: "
+                    f"{previous.start_time}-{previous.end_time} overlaps {current.start_time}-{current.end_time}"
+                )
+    return errors
+
+def bulk_create_availability(
+    db: Session,
+    windows: List[AvailabilityWindow],
+    replace_existing: bool = False
+) -> dict:
+    """
+    Validate and insert many availability windows in one transaction.
+
+    Overlaps are checked in memory per doctor and day, against each other and
+    against the doctors' existing windows (unless `replace_existing` is set, in
+    which case the existing windows of every doctor in the import are removed
+    first). Rows are written with a single bulk insert.
+    """
+    doctor_ids = sorted({window.doctor_id for window in windows})
+
+    # Every referenced user must be an existing doctor
+    known_doctors = set()
+    for chunk in _chunks(doctor_ids):
+        known_doctors.update(
+            row.id for row in db.query(User.id).filter(User.id.in_(chunk), User.role == "doctor")
+        )
+    errors = [f"Doctor {doctor_id} not found" for doctor_id in doctor_ids if doctor_id not in known_doctors]
+
+    existing: List[AvailabilityWindow] = []
+    if not replace_existing:
+        for chunk in _chunks(doctor_ids):
+            existing.extend(
+                AvailabilityWindow(*row) for row in db.query(
+                    DoctorAvailability.doctor_id,
+                    DoctorAvailability.day_of_week,
+                    DoctorAvailability.start_time,
+                    DoctorAvailability.end_time
+                ).filter(DoctorAvailability.doctor_id.in_(chunk))
+            )
+    errors.extend(find_overlaps(existing + list(windows)))
+
+    if errors:
+        raise AvailabilityImportError(errors)
+
+    replaced = 0
+    if replace_existing:
+        for chunk in _chunks(doctor_ids):
+            slot_table.delete_slots(db, doctor_ids=chunk)
+            replaced += db.execute(
+                delete(DoctorAvailability).where(DoctorAvailability.doctor_id.in_(chunk))
+            ).rowcount
+    if windows:
+        db.execute(insert(DoctorAvailability), [window._asdict() for window in windows])
+        for chunk in _chunks(doctor_ids):
+            slot_table.materialize_horizon(db, doctor_ids=chunk)
+    db.commit()
+
+    for doctor_id in doctor_ids:
+        slot_cache.invalidate_doctor(doctor_id)
+        slot_events.publish_resync(doctor_id)
+
+    return {"doctors": len(doctor_ids), "created": len(windows), "replaced": replaced}
+
+def read_availability_csv(db: Session, file: TextIO) -> List[AvailabilityWindow]:
+    """
+    Parse availability windows from CSV with the columns
+    doctor_id or doctor_email, day_of_week, start_time, end_time.
+    Doctor emails are resolved to ids in bulk.
+    """
+    errors = []
+    parsed = []
+    for line_number, row in enumerate(csv.DictReader(file), start=2):
+        doctor = (row.get("doctor_id") or "").strip() or (row.get("doctor_email") or "").strip()
+        if not doctor:
+            errors.append(f"Line {line_number}: doctor_id or doctor_email is required")
+            continue
+        try:
+            window = DoctorAvailabilityCreate(
+                day_of_week=row.get("day_of_week"),
+                start_time=row.get("start_time"),
+                end_time=row.get("end_time")
+            )
+        except ValidationError as e:
+            errors.append(f"Line {line_number}: {e.errors()[0]['msg']}")
+            continue
+        parsed.append((line_number, doctor, window))
+
+    emails = sorted({doctor for _, doctor, _ in parsed if not doctor.isdigit()})
+    ids_by_email = {}
+    for chunk in _chunks(emails):
+        ids_by_email.update(db.query(User.email, User.id).filter(User.email.in_(chunk)).all())
+
+    windows = []
+    for line_number, doctor, window in parsed:
+        doctor_id = int(doctor) if doctor.isdigit() else ids_by_email.get(doctor)
+        if doctor_id is None:
+            errors.append(f"Line {line_number}: unknown doctor {doctor}")
+            continue
+        windows.append(AvailabilityWindow(doctor_id, window.day_of_week, window.start_time, window.end_time))
+
+    if errors:
+        raise AvailabilityImportError(errors)
+    return windows
+
+def main() -> int:
+    """Import availability templates for many doctors from a CSV file"""
+    from app.database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("csv_file", type=argparse.FileType("r", encoding="utf-8"))
+    parser.add_argument("--replace", action="store_true", help="Replace the existing windows of the imported doctors")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        try:
+            result = bulk_create_availability(db, read_availability_csv(db, args.csv_file), args.replace)
+        except AvailabilityImportError as e:
+            for error in e.errors:
+                print(error, file=sys.stderr)
+            return 1
+    print(f"Imported {result['created']} windows for {result['doctors']} doctors ({result['replaced']} replaced)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
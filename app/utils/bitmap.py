@@ -0,0 +1,109 @@
+from datetime import time
+from typing import Iterable, List
+
+from app.utils.overlap import Interval
+
+MINUTES_PER_DAY = 24 * 60
+
+def time_to_minute(t: time, round_up: bool = False) -> int:
+    """Convert a time to minutes since midnight, rounding partial minutes down (or up)"""
+    minute = t.hour * 60 + t.minute
+    if round_up and (t.second or t.microsecond):
+        minute += 1
+    return minute
+
+def minute_mask(start_minute: int, end_minute: int) -> int:
+    """Bit mask with the bits for minutes [start_minute, end_minute) set"""
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+def minute_flags(mask: int) -> str:
+    """The mask as a string of "0" and "1" characters indexed by minute, for fast per-minute lookups"""
+    return format(mask, f"0{MINUTES_PER_DAY}b")[::-1]
+
+class DayBitmap:
+    """
+    Minute-resolution occupancy of a doctor's day stored as two integer bitsets.
+
+    Bit ``m`` of ``available`` is set when minute ``m`` falls inside one of the
+    doctor's availability windows and bit ``m`` of ``busy`` is set when it is
+    covered by a booked appointment. Windows are rounded inward and
+    appointments outward, so a minute is free only if all of it is.
+    """
+
+    def __init__(self, available: int = 0, busy: int = 0):
+        self.available = available
+        self.busy = busy
+
+    @classmethod
+    def from_schedule(cls, availabilities: Iterable = (), appointments: Iterable = ()) -> "DayBitmap":
+        """Build from objects or rows exposing start_time and end_time"""
+        available = 0
+        for availability in availabilities:
+            available |= minute_mask(
+                time_to_minute(availability.start_time, round_up=True),
+                time_to_minute(availability.end_time)
+            )
+
+        busy = 0
+        for appointment in appointments:
+            # time_to_minute inlined: this loop runs once per booked appointment
+            start, end = appointment.start_time, appointment.end_time
+            start_minute = start.hour * 60 + start.minute
+            end_minute = end.hour * 60 + end.minute + (1 if end.second or end.microsecond else 0)
+            if end_minute > start_minute:
+                busy |= ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+        return cls(available, busy)
+
+    @property
+    def free(self) -> int:
+        """Minutes that are inside an availability window and not booked"""
+        return self.available & ~self.busy
+
+    def is_busy(self, start_minute: int, end_minute: int) -> bool:
+        """Check whether any minute in [start_minute, end_minute) is booked"""
+        return bool(self.busy & minute_mask(start_minute, end_minute))
+
+    def overlaps(self, start: time, end: time) -> bool:
+        """Check whether [start, end) overlaps a booked appointment"""
+        return self.is_busy(time_to_minute(start), time_to_minute(end, round_up=True))
+
+    def is_bookable(self, start: time, end: time) -> bool:
+        """Check whether [start, end) lies inside an availability window and overlaps no booking"""
+        inside = minute_mask(time_to_minute(start, round_up=True), time_to_minute(end))
+        return self.available & inside == inside and not self.overlaps(start, end)
+
+    def free_start_mask(self, duration: int) -> int:
+        """
+        Bitset of the start minutes at which a booking of `duration` minutes fits.
+
+        Runs of free minutes are found by AND-ing the free bitset with shifted
+        copies of itself, doubling the covered length each step, so the cost is
+        O(log duration) whole-day operations rather than a loop per minute.
+        """
+        if duration <= 0:
+            return 0
+
+        runs = self.free
+        covered = 1
+        while covered < duration:
+            step = min(covered, duration - covered)
+            runs &= runs >> step
+            covered += step
+        return runs
+
+    def free_starts(self, duration: int) -> List[int]:
+        """All start minutes at which a booking of `duration` minutes fits, in order"""
+        runs = self.free_start_mask(duration)
+        starts = []
+        while runs:
+            lowest = runs & -runs
+            starts.append(lowest.bit_length() - 1)
+            runs ^= lowest
+        return starts
+
+    def mark_slots(self, slots: Iterable[Interval]) -> List[bool]:
+        """Return an availability flag for each slot based on booked minutes"""
+        return [not self.overlaps(start, end) for start, end in slots]
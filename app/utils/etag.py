@@ -0,0 +1,28 @@
+from fastapi import Response
+from typing import Optional
+import hashlib
+
+# Clients may keep responses but must revalidate them with If-None-Match before reuse
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """Strong ETag derived from version markers and the request parameters that shape the response"""
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match or etag is None:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag(response: Response, etag: Optional[str]):
+    """Tag the response, unless conditional requests are disabled (`etag` is None)"""
+    if etag is None:
+        return
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
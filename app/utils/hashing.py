@@ -0,0 +1,97 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from passlib.context import CryptContext
+from typing import Optional, Tuple
+from app.settings import get_settings
+import asyncio
+import multiprocessing
+import threading
+
+settings = get_settings()
+
+# bcrypt cost factor. Existing hashes with a different cost are rehashed on
+# the next successful login.
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+
+# Number of worker processes for hashing; 0 runs hashing in a thread instead
+PASSWORD_HASH_WORKERS = settings.password_hash_workers
+
+# Maximum number of hashing jobs queued or running before new ones are rejected
+PASSWORD_HASH_MAX_PENDING = settings.password_hash_max_pending
+
+pwd_context = CryptContext(
+    schemes=["bcrypt", "sha256_crypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_and_update_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one uses outdated settings"""
+    return pwd_context.verify_and_update(password, hashed_password)
+
+class PasswordHashPoolBusy(Exception):
+    """Raised when the hashing queue is full and the request should be retried later"""
+
+class PasswordHashPool:
+    """
+    Size-bounded executor for CPU-bound password hashing.
+
+    Work runs in a dedicated process pool so bcrypt does not occupy the
+    threads that serve ordinary API requests. At most `max_pending` jobs may
+    be queued or running; beyond that submit() fails fast with
+    PasswordHashPoolBusy instead of building an unbounded backlog.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.workers > 0:
+                    # Spawned workers only import this module, not the whole app
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(thread_name_prefix="password-hash")
+            return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHashPoolBusy("Too many password operations in progress")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_pool = PasswordHashPool()
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_and_update_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await password_pool.run(verify_and_update_password, password, hashed_password)
@@ -0,0 +1,121 @@
+from datetime import date, datetime, time
+from typing import Iterator, List, Optional
+import heapq
+
+from app.models.models import Appointment, AppointmentStatus, ArchivedAppointment
+from app.settings import get_settings
+from app.utils.archive import appointment_order
+from app.utils.cache import TTLCache
+
+CALENDAR_CACHE_MAX_FEED_BYTES = get_settings().calendar_cache_max_feed_bytes
+
+# Appointments fetched per database round trip while rendering a feed
+FEED_BATCH_SIZE = 1000
+
+PRODID = "-//Doctor Appointment Scheduler//Calendar Feed//EN"
+
+# Rendered feeds keyed by (doctor_id, version); a new version simply misses
+calendar_cache = TTLCache(maxsize=get_settings().calendar_cache_size, ttl=get_settings().calendar_cache_ttl)
+
+FEED_COLUMNS = ("id", "patient_id", "appointment_date", "start_time", "end_time", "status", "created_at", "updated_at")
+
+def _local(day: date, moment: time) -> str:
+    # Appointment times carry no timezone, so they are written as floating local
+    # times; isoformat is several times faster than strftime on large feeds
+    return f"{day.isoformat().replace('-', '')}T{moment.isoformat('seconds').replace(':', '')}"
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545, section 3.3.11)"""
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r", "").replace("\n", "\\n")
+    )
+
+def fold_line(line: str) -> str:
+    """Fold a content line longer than 75 octets (RFC 5545, section 3.1)"""
+    encoded = line.encode()
+    parts = []
+    while len(encoded) > 75 - bool(parts):
+        cut = 75 - bool(parts)
+        # Never split a multi-byte UTF-8 character
+        while encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    parts.append(encoded.decode())
+    return "\r\n ".join(parts)
+
+def render_header(doctor_name: str) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        fold_line(f"X-WR-CALNAME:{escape_text(doctor_name)} - Appointments"),
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+def render_footer() -> str:
+    return "END:VCALENDAR\r\n"
+
+def render_event(row) -> str:
+    """One VEVENT for an appointment row with the FEED_COLUMNS"""
+    stamp = row.updated_at or row.created_at or datetime.utcnow()
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:appointment-{row.id}@appointment-scheduler",
+        f"DTSTAMP:{_local(stamp.date(), stamp.time())}Z",
+        f"DTSTART:{_local(row.appointment_date, row.start_time)}",
+        f"DTEND:{_local(row.appointment_date, row.end_time)}",
+        # Patient names stay out of a feed that calendar services fetch by URL
+        f"SUMMARY:Appointment (patient #{row.patient_id})",
+        "STATUS:CONFIRMED",
+        "TRANSP:OPAQUE",
+        "END:VEVENT",
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+def stream_feed(db, doctor_id: int, doctor_name: str, cache_key=None) -> Iterator[str]:
+    """
+    Render a doctor's active appointments, archived ones included, as an
+    iCalendar feed, one batch of VEVENTs at a time from server-side cursors,
+    so memory use does not grow with the doctor's history. Unless the feed exceeds
+    CALENDAR_CACHE_MAX_FEED_BYTES, the rendered text is kept in
+    calendar_cache under `cache_key`.
+    """
+    chunks: Optional[List[str]] = [] if cache_key is not None else None
+    size = 0
+
+    def emit(chunk: str) -> str:
+        nonlocal chunks, size
+        if chunks is not None:
+            size += len(chunk)
+            chunks.append(chunk)
+            # Too large to cache: stop collecting and just stream
+            if size > CALENDAR_CACHE_MAX_FEED_BYTES:
+                chunks = None
+        return chunk
+
+    yield emit(render_header(doctor_name))
+    queries = [
+        db.query(*[getattr(model, column) for column in FEED_COLUMNS]).filter(
+            model.doctor_id == doctor_id,
+            model.status != AppointmentStatus.CANCELLED
+        ).order_by(
+            model.appointment_date, model.start_time, model.id
+        ).execution_options(yield_per=FEED_BATCH_SIZE)
+        for model in (ArchivedAppointment, Appointment)
+    ]
+
+    batch = []
+    for row in heapq.merge(*queries, key=appointment_order):
+        batch.append(render_event(row))
+        if len(batch) >= FEED_BATCH_SIZE:
+            yield emit("".join(batch))
+            batch = []
+    if batch:
+        yield emit("".join(batch))
+    yield emit(render_footer())
+
+    if chunks is not None:
+        calendar_cache.set(cache_key, "".join(chunks))
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+import os
+import socket
+import uuid
+
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import JobLease
+
+# Identifies this worker process as a lease holder
+LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def acquire_lease(db: Session, name: str, seconds: float) -> bool:
+    """
+    Take (or renew) the lease on job `name` for `seconds`, unless another
+    worker holds an unexpired one. Commits; returns whether this worker holds it.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=seconds)
+    taken = db.execute(
+        update(JobLease).where(
+            JobLease.name == name, or_(JobLease.expires_at < now, JobLease.holder == LEASE_HOLDER)
+        ).values(holder=LEASE_HOLDER, expires_at=expires_at)
+    ).rowcount
+    if not taken:
+        try:
+            db.execute(insert(JobLease).values(name=name, holder=LEASE_HOLDER, expires_at=expires_at))
+        except IntegrityError:
+            # The lease exists and another worker holds it
+            db.rollback()
+            return False
+    db.commit()
+    return True
@@ -0,0 +1,200 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.settings import get_settings
+
+METRICS_ENABLED = get_settings().metrics_enabled
+
+# Histogram buckets: request latency in seconds, and SQL statements per request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# Label for requests that did not match a route, so unknown paths cannot grow the label set
+UNMATCHED_ROUTE = "unmatched"
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the shape Prometheus expects"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            # Per-bucket counts (plus +Inf), sum, count
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+class RequestSqlStats:
+    """SQL statements issued while serving one request"""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+# Set by the middleware for the duration of a request. Threadpool and run_sync
+# calls inherit the context, so statements executed there are counted as well.
+_request_sql: ContextVar[Optional[RequestSqlStats]] = ContextVar("request_sql", default=None)
+
+class MetricsRegistry:
+    """
+    Request and SQL metrics, rendered in the Prometheus text exposition format.
+
+    Recording is a few dictionary updates under one lock, cheap enough to
+    leave on in production.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple, int] = {}
+        self.in_flight = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.request_sql_seconds: Dict[Tuple, float] = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status_code: int, seconds: float, sql: RequestSqlStats):
+        labels = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, str(status_code))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(labels, seconds)
+            self.request_queries.observe(labels, sql.statements)
+            self.request_sql_seconds[labels] = self.request_sql_seconds.get(labels, 0.0) + sql.seconds
+
+    def statement_executed(self, seconds: float):
+        with self._lock:
+            self.sql_statements += 1
+            self.sql_seconds += seconds
+        stats = _request_sql.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += seconds
+
+    def render(self) -> str:
+        lines = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, histogram: Histogram):
+            for (method, route), (counts, total, count) in sorted(histogram.series.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {total}")
+                lines.append(f"{name}_count{{{labels}}} {count}")
+
+        with self._lock:
+            header("http_requests_total", "counter", "HTTP requests by method, route template and status code.")
+            for (method, route, status_code), count in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {count}'
+                )
+
+            header("http_requests_in_progress", "gauge", "HTTP requests currently being served.")
+            lines.append(f"http_requests_in_progress {self.in_flight}")
+
+            header("http_request_duration_seconds", "histogram", "HTTP request latency by route template.")
+            histogram("http_request_duration_seconds", self.latency)
+
+            header("http_request_sql_statements", "histogram", "SQL statements issued per HTTP request.")
+            histogram("http_request_sql_statements", self.request_queries)
+
+            header("http_request_sql_seconds_total", "counter", "Time spent executing SQL while serving requests.")
+            for (method, route), seconds in sorted(self.request_sql_seconds.items()):
+                lines.append(
+                    f'http_request_sql_seconds_total{{method="{method}",route="{_escape(route)}"}} {seconds}'
+                )
+
+            header("sql_statements_total", "counter", "SQL statements executed, including outside requests.")
+            lines.append(f"sql_statements_total {self.sql_statements}")
+            header("sql_statement_seconds_total", "counter", "Time spent executing SQL statements.")
+            lines.append(f"sql_statement_seconds_total {self.sql_seconds}")
+
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics = MetricsRegistry()
+
+def instrument_engine(engine):
+    """Count and time every statement executed through `engine` (a sync Engine)"""
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        metrics.statement_executed(time.perf_counter() - conn.info["metrics_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _discard_timer(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency, in-flight requests and
+    SQL statements per request, labelled with the matched route template
+    (e.g. /appointments/{appointment_id}) rather than the raw path.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        sql = RequestSqlStats()
+        token = _request_sql.set(sql)
+        self.registry.request_started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            self.registry.request_finished(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                time.perf_counter() - started,
+                sql,
+            )
+            _request_sql.reset(token)
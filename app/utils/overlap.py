@@ -0,0 +1,65 @@
+from bisect import bisect_right
+from datetime import time
+from typing import Iterable, List, Sequence, Tuple
+
+Interval = Tuple[time, time]
+
+class BusyIntervals:
+    """
+    Sorted, merged set of busy intervals for a single day.
+
+    Appointments are sorted and merged once, after which any candidate
+    interval can be checked for overlap with a binary search instead of
+    scanning every appointment.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        self.starts: List[time] = []
+        self.ends: List[time] = []
+
+        for start, end in sorted(intervals):
+            # Merge with the previous interval if they overlap or touch
+            if self.ends and start <= self.ends[-1]:
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    @classmethod
+    def from_appointments(cls, appointments: Iterable) -> "BusyIntervals":
+        """Build from objects or rows exposing start_time and end_time"""
+        return cls((appointment.start_time, appointment.end_time) for appointment in appointments)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlaps(self, start: time, end: time) -> bool:
+        """Check whether [start, end) overlaps any busy interval"""
+        # First busy interval that ends after the candidate starts
+        index = bisect_right(self.ends, start)
+        return index < len(self.starts) and self.starts[index] < end
+
+    def mark_slots(self, slots: Sequence[Interval]) -> List[bool]:
+        """
+        Return an availability flag for each slot.
+
+        Slots sorted by start time are handled with a single merge pass over
+        the busy intervals; unsorted input falls back to a binary search per slot.
+        """
+        flags = []
+        index = 0
+        count = len(self.starts)
+        previous_start = None
+
+        for start, end in slots:
+            if previous_start is not None and start < previous_start:
+                index = bisect_right(self.ends, start)
+            else:
+                # Skip busy intervals that finish before this slot starts
+                while index < count and self.ends[index] <= start:
+                    index += 1
+            previous_start = start
+            flags.append(not (index < count and self.starts[index] < end))
+
+        return flags
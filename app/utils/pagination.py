@@ -0,0 +1,34 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time
+from typing import Tuple
+
+def _encode(*parts) -> str:
+    raw = "|".join(part.isoformat() if hasattr(part, "isoformat") else str(part) for part in parts)
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode(cursor: str) -> list:
+    return urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|")
+
+def encode_cursor(appointment_date: date, start_time: time, appointment_id: int) -> str:
+    """Opaque keyset cursor pointing just after the given appointment"""
+    return _encode(appointment_date, start_time, appointment_id)
+
+def decode_cursor(cursor: str) -> Tuple[date, time, int]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        appointment_date, start_time, appointment_id = _decode(cursor)
+        return date.fromisoformat(appointment_date), time.fromisoformat(start_time), int(appointment_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def encode_change_cursor(updated_at: datetime, appointment_id: int) -> str:
+    """Opaque change feed cursor pointing just after the given change"""
+    return _encode(updated_at, appointment_id)
+
+def decode_change_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_change_cursor; raises ValueError if it is malformed"""
+    try:
+        updated_at, appointment_id = _decode(cursor)
+        return datetime.fromisoformat(updated_at), int(appointment_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
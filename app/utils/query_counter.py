@@ -0,0 +1,35 @@
+from typing import List, Tuple
+
+from sqlalchemy import event
+
+class QueryCounter:
+    """
+    Context manager recording every SQL statement executed through the given
+    engines while it is active, for query budget checks:
+
+        with QueryCounter(engine) as counter:
+            client.get("/users/doctors")
+        assert counter.count <= 2, counter.statements
+    """
+
+    def __init__(self, *engines):
+        # Async engines are counted through the sync engine they wrap
+        self.engines = [getattr(engine, "sync_engine", engine) for engine in engines]
+        self.statements: List[Tuple[str, object]] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
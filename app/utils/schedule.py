@@ -1,8 +1,34 @@
 from datetime import datetime, timedelta, time, date
-from typing import List, Dict
+from typing import List, Dict, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.models import DoctorAvailability, Appointment, User
-from app.schemas.schemas import TimeSlot, AvailabilityDate
+from app.models.models import DoctorAvailability, Appointment, AppointmentStatus, User
+from app.schemas.schemas import TimeSlot, AvailabilityDate, NextAvailableSlot
+from app.utils.bitmap import DayBitmap, minute_flags
+from app.utils.overlap import BusyIntervals
+from app.utils.slot_cache import slot_cache
+from app.utils.slot_events import slot_events
+from app.utils import slot_table
+from app.settings import get_settings
+
+# Implementation used to mark slots and detect booking conflicts: "sweep" or "bitmap"
+SLOT_ENGINES = ("sweep", "bitmap")
+SLOT_ENGINE = get_settings().slot_engine
+
+# Unique index allowing one active appointment per doctor, date and start time
+ACTIVE_SLOT_INDEX = "uq_appointments_active_slot"
+# SQLite names the index's columns instead of the index
+SQLITE_ACTIVE_SLOT_VIOLATION = (
+    "UNIQUE constraint failed: appointments.doctor_id, appointments.appointment_date, appointments.start_time"
+)
+
+class SlotUnavailableError(ValueError):
+    """Raised when the requested slot is already booked by another appointment"""
+
+def is_slot_conflict(error: IntegrityError) -> bool:
+    """Whether an IntegrityError is the active slot index rejecting a second booking of a slot"""
+    message = str(error.orig)
+    return ACTIVE_SLOT_INDEX in message or SQLITE_ACTIVE_SLOT_VIOLATION in message
 
 def get_day_of_week(date_obj: date) -> int:
     """Get day of week (0-6, Monday is 0)"""
@@ -28,15 +54,117 @@ def create_time_slots(start_time: time, end_time: time, slot_duration: int = 40)
     
     return slots
 
+def resolve_slot_engine(slot_engine: Optional[str] = None) -> str:
+    """Return the requested slot engine, falling back to the configured default"""
+    slot_engine = slot_engine or SLOT_ENGINE
+    if slot_engine not in SLOT_ENGINES:
+        raise ValueError(f"Unknown slot engine '{slot_engine}', expected one of: {', '.join(SLOT_ENGINES)}")
+    return slot_engine
+
+def _seconds_to_time(seconds: int) -> time:
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+def build_time_slots_bitmap(
+    availabilities: List[DoctorAvailability],
+    existing_appointments: List[Appointment],
+    slot_duration: int = 40
+) -> List[TimeSlot]:
+    """
+    Build the time slots for one day using a minute-resolution bitmap of the
+    availability windows and booked appointments. The start minutes at which
+    a whole slot is free are found once for the day, so each slot on a
+    whole-minute grid is a single bit test.
+    """
+    day = DayBitmap.from_schedule(availabilities, existing_appointments)
+    free_starts = minute_flags(day.free_start_mask(slot_duration))
+    step = slot_duration * 60
+    all_time_slots = []
+    
+    for availability in availabilities:
+        window_start = availability.start_time.hour * 3600 + availability.start_time.minute * 60 + availability.start_time.second
+        window_end = availability.end_time.hour * 3600 + availability.end_time.minute * 60 + availability.end_time.second
+        
+        for slot_start in range(window_start, window_end - step + 1, step):
+            slot_end = slot_start + step
+            if slot_start % 60 == 0:
+                is_available = free_starts[slot_start // 60] == "1"
+            else:
+                # Windows starting mid-minute: round the slot outward and probe the booked minutes
+                is_available = not day.is_busy(slot_start // 60, -(-slot_end // 60))
+            all_time_slots.append(
+                TimeSlot.model_construct(
+                    start_time=_seconds_to_time(slot_start),
+                    end_time=_seconds_to_time(slot_end),
+                    is_available=is_available
+                )
+            )
+    
+    return all_time_slots
+
+def build_time_slots(
+    availabilities: List[DoctorAvailability],
+    existing_appointments: List[Appointment],
+    slot_duration: int = 40,
+    slot_engine: Optional[str] = None
+) -> List[TimeSlot]:
+    """
+    Build the time slots for one day from the doctor's availability windows
+    and the non-cancelled appointments already booked on that day
+    """
+    if resolve_slot_engine(slot_engine) == "bitmap":
+        return build_time_slots_bitmap(availabilities, existing_appointments, slot_duration)
+    
+    # Sort and merge the booked intervals once for the whole day
+    busy = BusyIntervals.from_appointments(existing_appointments)
+    
+    # Create a list to store all available slots
+    all_time_slots = []
+    
+    # For each availability timeframe
+    for availability in availabilities:
+        # Create all possible slots within this availability
+        slots = create_time_slots(
+            availability.start_time, 
+            availability.end_time, 
+            slot_duration
+        )
+        
+        # Mark slots as available or not with a single sweep over the booked intervals
+        flags = busy.mark_slots([(slot["start_time"], slot["end_time"]) for slot in slots])
+        
+        for slot, is_available in zip(slots, flags):
+            all_time_slots.append(
+                TimeSlot(
+                    start_time=slot["start_time"],
+                    end_time=slot["end_time"],
+                    is_available=is_available
+                )
+            )
+    
+    return all_time_slots
+
 def get_doctor_available_slots(
     db: Session, 
     doctor_id: int, 
     check_date: date,
-    slot_duration: int = 40
+    slot_duration: int = 40,
+    slot_engine: Optional[str] = None
 ) -> AvailabilityDate:
     """
-    Get all available time slots for a given doctor on a specific date
+    Get all available time slots for a given doctor on a specific date.
+    Results are cached until a booking, cancellation or availability change
+    for the doctor invalidates them.
     """
+    cached, cache_key = slot_cache.lookup(doctor_id, check_date, slot_duration)
+    if cached is not None:
+        return cached
+    
+    # Within the materialized horizon the slots are a single indexed lookup
+    if slot_table.covers(check_date, slot_duration=slot_duration):
+        result = AvailabilityDate(date=check_date, time_slots=slot_table.read_day_slots(db, doctor_id, check_date))
+        slot_cache.store(cache_key, result)
+        return result
+    
     # Get day of week (0-6) from the date
     day_of_week = get_day_of_week(check_date)
     
@@ -48,49 +176,197 @@ def get_doctor_available_slots(
     
     # If doctor is not available on this day
     if not availabilities:
-        return AvailabilityDate(date=check_date, time_slots=[])
+        result = AvailabilityDate(date=check_date, time_slots=[])
+        slot_cache.store(cache_key, result)
+        return result
     
     # Get all appointments for this doctor on this date
     existing_appointments = db.query(Appointment).filter(
         Appointment.doctor_id == doctor_id,
         Appointment.appointment_date == check_date,
-        Appointment.status != "cancelled"
+        Appointment.status != AppointmentStatus.CANCELLED
     ).all()
     
-    # Create a list to store all available slots
-    all_time_slots = []
+    all_time_slots = build_time_slots(availabilities, existing_appointments, slot_duration, slot_engine)
     
-    # For each availability timeframe
+    result = AvailabilityDate(date=check_date, time_slots=all_time_slots)
+    slot_cache.store(cache_key, result)
+    return result
+
+def get_doctor_available_slots_range(
+    db: Session,
+    doctor_id: int,
+    start_date: date,
+    end_date: date,
+    slot_duration: int = 40,
+    slot_engine: Optional[str] = None
+) -> List[AvailabilityDate]:
+    """
+    Get the available time slots for a doctor for every date in a range (inclusive).
+    Loads the doctor's weekly availability once and all appointments in the
+    range with a single query instead of querying day by day.
+    """
+    if slot_table.covers(start_date, end_date, slot_duration):
+        slots_by_date = slot_table.read_range_slots(db, doctor_id, start_date, end_date)
+        return [
+            AvailabilityDate(date=start_date + timedelta(days=offset), time_slots=slots_by_date.get(
+                start_date + timedelta(days=offset), []
+            ))
+            for offset in range((end_date - start_date).days + 1)
+        ]
+    
+    # Group the doctor's availability windows by day of week
+    availabilities_by_day: Dict[int, List[DoctorAvailability]] = {}
+    availabilities = db.query(DoctorAvailability).filter(
+        DoctorAvailability.doctor_id == doctor_id
+    ).all()
     for availability in availabilities:
-        # Create all possible slots within this availability
-        slots = create_time_slots(
-            availability.start_time, 
-            availability.end_time, 
-            slot_duration
+        availabilities_by_day.setdefault(availability.day_of_week, []).append(availability)
+    
+    # Group all appointments in the range by date
+    appointments_by_date: Dict[date, List[Appointment]] = {}
+    if availabilities:
+        existing_appointments = db.query(Appointment).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.appointment_date >= start_date,
+            Appointment.appointment_date <= end_date,
+            Appointment.status != AppointmentStatus.CANCELLED
+        ).all()
+        for appointment in existing_appointments:
+            appointments_by_date.setdefault(appointment.appointment_date, []).append(appointment)
+    
+    result = []
+    current_date = start_date
+    while current_date <= end_date:
+        day_availabilities = availabilities_by_day.get(get_day_of_week(current_date), [])
+        result.append(
+            AvailabilityDate(
+                date=current_date,
+                time_slots=build_time_slots(
+                    day_availabilities,
+                    appointments_by_date.get(current_date, []),
+                    slot_duration,
+                    slot_engine
+                )
+            )
+        )
+        current_date += timedelta(days=1)
+    
+    return result
+
+def find_next_available_slots(
+    db: Session,
+    start_date: date,
+    limit: int = 10,
+    horizon_days: int = 14,
+    doctor_ids: Optional[List[int]] = None,
+    slot_duration: int = 40,
+    chunk_days: int = 7,
+    slot_engine: Optional[str] = None
+) -> List[NextAvailableSlot]:
+    """
+    Find the earliest free slots across all active doctors (or the given doctors).
+    Walks forward from start_date in chunks of days, loading availability once and
+    the appointments of every doctor in the chunk with a single query, and stops as
+    soon as `limit` slots have been found or the horizon is reached. Slots that
+    start before now are never returned, so a past start_date counts from today.
+    """
+    now = datetime.now()
+    start_date = max(start_date, now.date())
+    end_date = start_date + timedelta(days=horizon_days - 1)
+    if slot_table.covers(start_date, end_date, slot_duration):
+        return [
+            NextAvailableSlot(
+                doctor_id=row.doctor_id,
+                doctor_name=row.full_name,
+                date=row.slot_date,
+                start_time=row.start_time,
+                end_time=row.end_time
+            )
+            for row in slot_table.find_free_slots(db, start_date, end_date, limit, doctor_ids)
+        ]
+    
+    # Load the weekly availability of every matching doctor in one query
+    availability_query = db.query(DoctorAvailability, User.full_name).join(
+        User, DoctorAvailability.doctor_id == User.id
+    ).filter(
+        User.role == "doctor",
+        User.is_active == True
+    )
+    if doctor_ids:
+        availability_query = availability_query.filter(DoctorAvailability.doctor_id.in_(doctor_ids))
+    
+    availabilities_by_day: Dict[int, Dict[int, List[DoctorAvailability]]] = {}
+    doctor_names: Dict[int, str] = {}
+    for availability, full_name in availability_query.all():
+        doctor_names[availability.doctor_id] = full_name
+        availabilities_by_day.setdefault(availability.day_of_week, {}).setdefault(
+            availability.doctor_id, []
+        ).append(availability)
+    
+    if not doctor_names:
+        return []
+    
+    results: List[NextAvailableSlot] = []
+    chunk_start = start_date
+    
+    while chunk_start <= end_date and len(results) < limit:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        
+        # Load the appointments of every matching doctor in this chunk in one query
+        appointment_query = db.query(
+            Appointment.doctor_id,
+            Appointment.appointment_date,
+            Appointment.start_time,
+            Appointment.end_time
+        ).filter(
+            Appointment.appointment_date >= chunk_start,
+            Appointment.appointment_date <= chunk_end,
+            Appointment.status != AppointmentStatus.CANCELLED
         )
+        if doctor_ids:
+            appointment_query = appointment_query.filter(Appointment.doctor_id.in_(doctor_ids))
         
-        # Mark slots as available or not based on existing appointments
-        for slot in slots:
-            is_available = True
-            
-            for appointment in existing_appointments:
-                # If appointment overlaps with this slot, mark as unavailable
-                appt_start = appointment.start_time
-                appt_end = appointment.end_time
-                
-                if (slot["start_time"] < appt_end and slot["end_time"] > appt_start):
-                    is_available = False
-                    break
+        appointments_by_key: Dict[tuple, list] = {}
+        for appointment in appointment_query.all():
+            appointments_by_key.setdefault(
+                (appointment.doctor_id, appointment.appointment_date), []
+            ).append(appointment)
+        
+        current_date = chunk_start
+        while current_date <= chunk_end and len(results) < limit:
+            day_slots = []
+            for doctor_id, day_availabilities in availabilities_by_day.get(get_day_of_week(current_date), {}).items():
+                time_slots = build_time_slots(
+                    day_availabilities,
+                    appointments_by_key.get((doctor_id, current_date), []),
+                    slot_duration,
+                    slot_engine
+                )
+                for slot in time_slots:
+                    if not slot.is_available:
+                        continue
+                    # Skip slots that have already started
+                    if datetime.combine(current_date, slot.start_time) <= now:
+                        continue
+                    day_slots.append((slot.start_time, doctor_id, slot.end_time))
             
-            all_time_slots.append(
-                TimeSlot(
-                    start_time=slot["start_time"],
-                    end_time=slot["end_time"],
-                    is_available=is_available
+            # Every slot on this day is earlier than any slot on a later day
+            for slot_start, doctor_id, slot_end in sorted(day_slots)[:limit - len(results)]:
+                results.append(
+                    NextAvailableSlot(
+                        doctor_id=doctor_id,
+                        doctor_name=doctor_names[doctor_id],
+                        date=current_date,
+                        start_time=slot_start,
+                        end_time=slot_end
+                    )
                 )
-            )
+            current_date += timedelta(days=1)
+        
+        chunk_start = chunk_end + timedelta(days=1)
     
-    return AvailabilityDate(date=check_date, time_slots=all_time_slots)
+    return results
 
 def book_appointment(
     db: Session,
@@ -98,7 +374,8 @@ def book_appointment(
     patient_id: int,
     appointment_date: date,
     start_time: time,
-    slot_duration: int = 40
+    slot_duration: int = 40,
+    slot_engine: Optional[str] = None
 ) -> Appointment:
     """Book an appointment if the slot is available"""
     
@@ -117,13 +394,48 @@ def book_appointment(
     if not patient:
         raise ValueError("Patient not found or not active")
     
-    # Check if the slot is available
-    day_of_week = get_day_of_week(appointment_date)
+    # Both slot stores reject a slot outside the availability or off its grid the same way
+    availability = _find_slot_window(db, doctor_id, appointment_date, start_time, end_time, slot_duration)
+    
+    if slot_table.covers(appointment_date, slot_duration=slot_duration):
+        # Claiming the materialized slot is the conflict check
+        if not slot_table.claim_slot(db, doctor_id, appointment_date, start_time):
+            if slot_table.slot_exists(db, doctor_id, appointment_date, start_time):
+                raise SlotUnavailableError("This time slot is already booked")
+            raise ValueError("The doctor is not available at this time")
+        return _insert_appointment(db, doctor_id, patient_id, appointment_date, start_time, end_time)
     
+    # Check if there's any conflicting appointment
+    booked_intervals = db.query(Appointment.start_time, Appointment.end_time).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_date == appointment_date,
+        Appointment.status != AppointmentStatus.CANCELLED
+    ).all()
+    
+    if resolve_slot_engine(slot_engine) == "bitmap":
+        # The window already covers the slot, so only a booking can make it unbookable
+        bookable = DayBitmap.from_schedule([availability], booked_intervals).is_bookable(start_time, end_time)
+    else:
+        bookable = not BusyIntervals.from_appointments(booked_intervals).overlaps(start_time, end_time)
+    
+    if not bookable:
+        raise SlotUnavailableError("This time slot is already booked")
+    
+    return _insert_appointment(db, doctor_id, patient_id, appointment_date, start_time, end_time)
+
+def _find_slot_window(
+    db: Session,
+    doctor_id: int,
+    appointment_date: date,
+    start_time: time,
+    end_time: time,
+    slot_duration: int
+) -> DoctorAvailability:
+    """The availability window holding the slot; raises ValueError if there is none or the slot is off its grid"""
     # Check if doctor is available on this day
     availability = db.query(DoctorAvailability).filter(
         DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.day_of_week == day_of_week,
+        DoctorAvailability.day_of_week == get_day_of_week(appointment_date),
         DoctorAvailability.start_time <= start_time,
         DoctorAvailability.end_time >= end_time
     ).first()
@@ -131,20 +443,25 @@ def book_appointment(
     if not availability:
         raise ValueError("The doctor is not available at this time")
     
-    # Check if there's any conflicting appointment
-    conflicting_appointment = db.query(Appointment).filter(
-        Appointment.doctor_id == doctor_id,
-        Appointment.appointment_date == appointment_date,
-        Appointment.status != "cancelled",
-        # Check for overlap
-        ((Appointment.start_time <= start_time) & (Appointment.end_time > start_time)) |
-        ((Appointment.start_time < end_time) & (Appointment.end_time >= end_time)) |
-        ((Appointment.start_time >= start_time) & (Appointment.end_time <= end_time))
-    ).first()
-    
-    if conflicting_appointment:
-        raise ValueError("This time slot is already booked")
+    # Bookings must start on the slot grid of the availability window, so two
+    # overlapping bookings always claim the same (doctor, date, start_time)
+    offset = (
+        datetime.combine(date.today(), start_time) - datetime.combine(date.today(), availability.start_time)
+    )
+    if offset % timedelta(minutes=slot_duration):
+        raise ValueError("Appointments must start at the beginning of a time slot")
     
+    return availability
+
+def _insert_appointment(
+    db: Session,
+    doctor_id: int,
+    patient_id: int,
+    appointment_date: date,
+    start_time: time,
+    end_time: time
+) -> Appointment:
+    """Insert a scheduled appointment and commit; a taken slot raises SlotUnavailableError"""
     # Create new appointment
     new_appointment = Appointment(
         doctor_id=doctor_id,
@@ -152,11 +469,22 @@ def book_appointment(
         appointment_date=appointment_date,
         start_time=start_time,
         end_time=end_time,
-        status="scheduled"
+        status=AppointmentStatus.SCHEDULED
     )
     
     db.add(new_appointment)
-    db.commit()
+    try:
+        # The unique slot index rejects a concurrent booking of the same slot
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if not is_slot_conflict(e):
+            raise
+        raise SlotUnavailableError("This time slot is already booked")
+    
+    # The doctor's slots for this date have changed
+    slot_cache.invalidate_date(doctor_id, appointment_date)
+    slot_events.publish_slot(doctor_id, appointment_date, start_time, end_time, is_available=False)
     db.refresh(new_appointment)
     
-    return new_appointment 
\ No newline at end of file
+    return new_appointment 
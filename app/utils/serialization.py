@@ -0,0 +1,54 @@
+from typing import Any, Iterable, List, Optional, Tuple, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from pydantic_core import to_json, to_jsonable_python
+
+from app.settings import get_settings
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are offered only when msgpack is installed
+    msgpack = None
+
+# Serve list endpoints through fast_response instead of their response_model
+FAST_RESPONSES = get_settings().fast_responses
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def schema_columns(schema: Type[BaseModel], model) -> Tuple[List[str], list]:
+    """
+    Field names of a response schema and the model columns with the same
+    names, in the schema's field order, so rows selected with these columns
+    serialize exactly like the schema would
+    """
+    fields = list(schema.model_fields)
+    return fields, [getattr(model, field) for field in fields]
+
+def rows_to_dicts(fields: List[str], rows: Iterable[tuple]) -> List[dict]:
+    return [dict(zip(fields, row)) for row in rows]
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+def fast_response(request: Request, content: Any, response: Optional[Response] = None) -> Response:
+    """
+    Encode trusted content (plain rows, dicts, or models that were already
+    validated when they were built) without FastAPI's response_model pass,
+    which re-validates every item and then encodes with the stdlib json
+    module. JSON is written by pydantic-core's encoder, in the same format as
+    the response models; clients that accept application/msgpack get
+    MessagePack instead. Headers already set on `response` are carried over.
+    """
+    if wants_msgpack(request):
+        fast = Response(msgpack.packb(to_jsonable_python(content)), media_type=MSGPACK_MEDIA_TYPES[0])
+    else:
+        fast = Response(to_json(content), media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                fast.headers[name] = value
+    if msgpack is not None:
+        fast.headers["Vary"] = "Accept"
+    return fast
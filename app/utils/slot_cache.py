@@ -0,0 +1,175 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any, Optional, Tuple
+from uuid import uuid4
+import threading
+
+from app.settings import get_settings
+from app.utils.cache import TTLCache
+
+SLOT_CACHE_SIZE = get_settings().slot_cache_size
+SLOT_CACHE_TTL = get_settings().slot_cache_ttl
+SINGLE_WORKER = get_settings().single_worker
+
+class SlotCacheBackend(ABC):
+    """
+    Storage interface for the slot cache.
+
+    The default backend keeps everything in process. A shared cache (e.g. Redis
+    or memcached) can be dropped in by implementing these methods and passing
+    it to SlotCache; keys are plain strings so they map directly onto one. A
+    backend missing one of them fails when it is created.
+    Such a backend sets `shared`, since every worker then sees the same
+    version markers.
+    """
+
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """The value stored under `key`, or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        """Store `value` under `key`"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove `key` if present"""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every key"""
+
+    def stats(self) -> dict:
+        return {}
+
+class InMemorySlotCacheBackend(SlotCacheBackend):
+    """Per-process LRU backend with a TTL as a safety net for writes made by other workers"""
+
+    def __init__(self, maxsize: int = SLOT_CACHE_SIZE, ttl: float = SLOT_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: Any):
+        self._cache.set(key, value)
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        return {"size": stats["size"], "maxsize": stats["maxsize"], "evictions": stats["evictions"]}
+
+class SlotCache:
+    """
+    Cache of computed AvailabilityDate results keyed by (doctor_id, date, slot_duration).
+
+    Entries are stamped with a version for the doctor and one for the date.
+    Invalidation replaces the version instead of deleting entries, so a result
+    computed from data read before a write can never be served after it: it
+    is stored under the old version and simply ages out of the LRU.
+
+    The same versions serve as cheap ETag markers for the schedule read
+    endpoints, together with a directory version that changes whenever a
+    doctor account is added, changed or removed, and a per-doctor
+    appointments version that changes with any of the doctor's bookings.
+    """
+
+    def __init__(self, backend: Optional[SlotCacheBackend] = None):
+        self.backend = backend or InMemorySlotCacheBackend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _version(self, key: str) -> str:
+        version = self.backend.get(key)
+        if version is None:
+            version = uuid4().hex
+            self.backend.set(key, version)
+        return version
+
+    def schedule_version(self, doctor_id: int, check_date: Optional[date] = None) -> str:
+        """Marker for the doctor's availability and, given a date, that day's bookings"""
+        version = self._version(f"slots-version:{doctor_id}")
+        if check_date is not None:
+            version += ":" + self._version(f"slots-version:{doctor_id}:{check_date.isoformat()}")
+        return version
+
+    def appointments_version(self, doctor_id: int) -> str:
+        """Marker for all of the doctor's appointments, on any date"""
+        return self._version(f"appointments-version:{doctor_id}")
+
+    def directory_version(self) -> str:
+        """Marker for the set of doctor accounts"""
+        return self._version("doctors-version")
+
+    @property
+    def etags_enabled(self) -> bool:
+        """
+        Whether the version markers may answer conditional requests or key a
+        cache of rendered responses. With per-process markers and several
+        workers, a worker that did not handle a write would keep its old
+        marker and answer 304, or serve its cached copy, for stale data.
+        """
+        return self.backend.shared or SINGLE_WORKER
+
+    def _entry_key(self, doctor_id: int, check_date: date, slot_duration: int) -> str:
+        version = self.schedule_version(doctor_id, check_date)
+        return f"slots:{doctor_id}:{check_date.isoformat()}:{slot_duration}:{version}"
+
+    def lookup(self, doctor_id: int, check_date: date, slot_duration: int) -> Tuple[Any, str]:
+        """Return (cached result or None, key to store a freshly computed result under)"""
+        key = self._entry_key(doctor_id, check_date, slot_duration)
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value, key
+
+    def store(self, key: str, value: Any):
+        self.backend.set(key, value)
+
+    def invalidate_date(self, doctor_id: int, check_date: date):
+        """A booking or cancellation changed one of the doctor's days"""
+        self.backend.set(f"slots-version:{doctor_id}:{check_date.isoformat()}", uuid4().hex)
+        self.backend.set(f"appointments-version:{doctor_id}", uuid4().hex)
+        with self._lock:
+            self.invalidations += 1
+
+    def invalidate_doctor(self, doctor_id: int):
+        """The doctor's weekly availability changed, affecting every date"""
+        self.backend.set(f"slots-version:{doctor_id}", uuid4().hex)
+        with self._lock:
+            self.invalidations += 1
+
+    def invalidate_directory(self):
+        """A doctor account was added, changed or removed"""
+        self.backend.set("doctors-version", uuid4().hex)
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+slot_cache = SlotCache()
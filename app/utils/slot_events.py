@@ -0,0 +1,131 @@
+from datetime import date, time
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+import threading
+
+from app.settings import get_settings
+
+SLOT_EVENTS_MAX_SUBSCRIBERS = get_settings().slot_events_max_subscribers
+SLOT_EVENTS_QUEUE_SIZE = get_settings().slot_events_queue_size
+
+# Queued in place of a subscriber's events when it fell too far behind, or
+# published when a doctor's availability windows changed; the subscriber
+# reloads the full state instead of applying deltas
+RESYNC = {"type": "resync"}
+
+class SubscriberLimitError(RuntimeError):
+    """Raised when this worker already serves the maximum number of event streams"""
+
+class SlotSubscription:
+    """One event stream's view of a doctor's slots on one date"""
+
+    def __init__(self, doctor_id: int, check_date: date, queue_size: int):
+        self.doctor_id = doctor_id
+        self.check_date = check_date
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """The next event, or None if none arrived within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class SlotEventBroker:
+    """
+    In-process pub/sub of slot changes, keyed by (doctor_id, date).
+
+    Publishers run in the threadpool or on the event loop; events are handed
+    to each subscriber's loop with call_soon_threadsafe. Every subscriber has
+    a bounded queue: a subscriber that falls behind has its backlog replaced
+    by a single RESYNC event, so a slow client costs bounded memory and never
+    slows down publishers or other subscribers.
+    """
+
+    def __init__(self, max_subscribers: int = SLOT_EVENTS_MAX_SUBSCRIBERS, queue_size: int = SLOT_EVENTS_QUEUE_SIZE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Tuple[int, date], Set[SlotSubscription]] = {}
+        self._count = 0
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, doctor_id: int, check_date: date) -> SlotSubscription:
+        """Start receiving the changes of one doctor and date; call from the event loop"""
+        subscription = SlotSubscription(doctor_id, check_date, self.queue_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise SubscriberLimitError("Too many slot event streams on this server, try again later")
+            self._subscribers.setdefault((doctor_id, check_date), set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: SlotSubscription):
+        key = (subscription.doctor_id, subscription.check_date)
+        with self._lock:
+            subscribers = self._subscribers.get(key)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[key]
+            self._count -= 1
+
+    def _deliver(self, subscription: SlotSubscription, event: dict):
+        # Runs on the subscriber's event loop
+        if subscription.queue.full():
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(RESYNC)
+            with self._lock:
+                self.overflows += 1
+            return
+        subscription.queue.put_nowait(event)
+
+    def publish(self, doctor_id: int, check_date: Optional[date], event: dict):
+        """Send an event to the subscribers of a doctor's date, or of all their dates if `check_date` is None"""
+        with self._lock:
+            if check_date is not None:
+                subscribers = list(self._subscribers.get((doctor_id, check_date), ()))
+            else:
+                subscribers = [
+                    subscription
+                    for (subscribed_doctor_id, _), day_subscribers in self._subscribers.items()
+                    if subscribed_doctor_id == doctor_id
+                    for subscription in day_subscribers
+                ]
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(self._deliver, subscription, event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+    def publish_slot(self, doctor_id: int, check_date: date, start_time: time, end_time: time, is_available: bool):
+        """A slot was booked (is_available=False) or freed by a cancellation"""
+        self.publish(doctor_id, check_date, {
+            "type": "slot",
+            "doctor_id": doctor_id,
+            "date": check_date.isoformat(),
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "is_available": is_available,
+        })
+
+    def publish_resync(self, doctor_id: int):
+        """The doctor's availability windows changed, so every date's slots may have"""
+        self.publish(doctor_id, None, RESYNC)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": self._count,
+                "max_subscribers": self.max_subscribers,
+                "published": self.published,
+                "overflows": self.overflows,
+            }
+
+slot_events = SlotEventBroker()
@@ -0,0 +1,316 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import asyncio
+import logging
+import sys
+
+from sqlalchemy import delete, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.models import Appointment, AppointmentStatus, DoctorAvailability, Slot, User
+from app.schemas.schemas import TimeSlot
+from app.settings import get_settings
+from app.utils.leases import acquire_lease
+from app.utils.overlap import BusyIntervals
+
+logger = logging.getLogger(__name__)
+
+SLOT_TABLE_ENABLED = get_settings().slot_store == "table"
+SLOT_HORIZON_DAYS = get_settings().slot_horizon_days
+
+# Only slots of the standard length are materialized
+SLOT_DURATION = 40
+
+# Rows per bulk insert when materializing slots
+INSERT_BATCH_SIZE = 5000
+
+# The roll-forward job materializes one day beyond the horizon, so the last
+# served day exists even before the job has run after midnight
+HORIZON_MARGIN_DAYS = 1
+
+# How long the worker running the roll-forward job keeps the others from running it
+ROLL_FORWARD_LEASE_SECONDS = 3600
+
+def covers(start_date: date, end_date: Optional[date] = None, slot_duration: int = SLOT_DURATION) -> bool:
+    """Whether reads and bookings for these dates can be served from the slots table"""
+    if not SLOT_TABLE_ENABLED or slot_duration != SLOT_DURATION:
+        return False
+    today = date.today()
+    return today <= start_date and (end_date or start_date) < today + timedelta(days=SLOT_HORIZON_DAYS)
+
+def _window_slots(window: DoctorAvailability, slot_duration: int = SLOT_DURATION) -> List[Tuple[time, time]]:
+    step = timedelta(minutes=slot_duration)
+    current = datetime.combine(date.min, window.start_time)
+    window_end = datetime.combine(date.min, window.end_time)
+    slots = []
+    while current + step <= window_end:
+        slots.append((current.time(), (current + step).time()))
+        current += step
+    return slots
+
+def materialize_slots(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    doctor_ids: Optional[List[int]] = None,
+    availability_ids: Optional[List[int]] = None
+) -> int:
+    """
+    Insert the missing slots of the matching availability windows for every
+    date in the range (inclusive), marking slots that overlap an active
+    appointment as unavailable. Existing rows are left alone, so this is safe
+    to re-run. Does not commit; returns the number of rows inserted.
+    """
+    window_query = db.query(DoctorAvailability)
+    if doctor_ids is not None:
+        window_query = window_query.filter(DoctorAvailability.doctor_id.in_(doctor_ids))
+    if availability_ids is not None:
+        window_query = window_query.filter(DoctorAvailability.id.in_(availability_ids))
+    windows_by_day: Dict[int, List[DoctorAvailability]] = {}
+    for window in window_query.all():
+        windows_by_day.setdefault(window.day_of_week, []).append(window)
+    if not windows_by_day:
+        return 0
+    window_doctor_ids = sorted({window.doctor_id for windows in windows_by_day.values() for window in windows})
+
+    existing = set(
+        db.query(Slot.doctor_id, Slot.slot_date, Slot.start_time).filter(
+            Slot.doctor_id.in_(window_doctor_ids),
+            Slot.slot_date >= start_date,
+            Slot.slot_date <= end_date
+        ).all()
+    )
+
+    appointments_by_day: Dict[Tuple[int, date], list] = {}
+    for appointment in db.query(
+        Appointment.doctor_id, Appointment.appointment_date, Appointment.start_time, Appointment.end_time
+    ).filter(
+        Appointment.doctor_id.in_(window_doctor_ids),
+        Appointment.appointment_date >= start_date,
+        Appointment.appointment_date <= end_date,
+        Appointment.status != AppointmentStatus.CANCELLED
+    ):
+        appointments_by_day.setdefault((appointment.doctor_id, appointment.appointment_date), []).append(appointment)
+
+    rows = []
+    created = 0
+    current_date = start_date
+    while current_date <= end_date:
+        for window in windows_by_day.get(current_date.weekday(), []):
+            slots = [
+                slot for slot in _window_slots(window)
+                if (window.doctor_id, current_date, slot[0]) not in existing
+            ]
+            busy = BusyIntervals.from_appointments(appointments_by_day.get((window.doctor_id, current_date), []))
+            for (start_time, end_time), is_available in zip(slots, busy.mark_slots(slots)):
+                rows.append({
+                    "doctor_id": window.doctor_id,
+                    "availability_id": window.id,
+                    "slot_date": current_date,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "is_available": is_available,
+                })
+            if len(rows) >= INSERT_BATCH_SIZE:
+                db.execute(insert(Slot), rows)
+                created += len(rows)
+                rows = []
+        current_date += timedelta(days=1)
+    if rows:
+        db.execute(insert(Slot), rows)
+        created += len(rows)
+    return created
+
+def materialize_horizon(
+    db: Session,
+    doctor_ids: Optional[List[int]] = None,
+    availability_ids: Optional[List[int]] = None
+) -> int:
+    """Materialize the matching windows for the whole rolling horizon; does not commit"""
+    if not SLOT_TABLE_ENABLED:
+        return 0
+    today = date.today()
+    end_date = today + timedelta(days=SLOT_HORIZON_DAYS + HORIZON_MARGIN_DAYS - 1)
+    return materialize_slots(db, today, end_date, doctor_ids=doctor_ids, availability_ids=availability_ids)
+
+def delete_slots(
+    db: Session,
+    doctor_ids: Optional[List[int]] = None,
+    availability_ids: Optional[List[int]] = None
+) -> int:
+    """Remove the slots of the given doctors or availability windows; does not commit"""
+    if not SLOT_TABLE_ENABLED:
+        return 0
+    statement = delete(Slot)
+    if doctor_ids is not None:
+        statement = statement.where(Slot.doctor_id.in_(doctor_ids))
+    if availability_ids is not None:
+        statement = statement.where(Slot.availability_id.in_(availability_ids))
+    return db.execute(statement).rowcount
+
+def claim_slot(db: Session, doctor_id: int, slot_date: date, start_time: time) -> bool:
+    """
+    Mark a free slot as booked with one conditional update; False if the slot
+    is taken or does not exist. Concurrent claims of the same slot serialize
+    on its row, so only one of them succeeds. Does not commit.
+    """
+    result = db.execute(
+        update(Slot).where(
+            Slot.doctor_id == doctor_id,
+            Slot.slot_date == slot_date,
+            Slot.start_time == start_time,
+            Slot.is_available == True
+        ).values(is_available=False).execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def release_slot(db: Session, doctor_id: int, slot_date: date, start_time: time):
+    """Mark a slot as free again after its appointment was cancelled; does not commit"""
+    db.execute(
+        update(Slot).where(
+            Slot.doctor_id == doctor_id,
+            Slot.slot_date == slot_date,
+            Slot.start_time == start_time
+        ).values(is_available=True).execution_options(synchronize_session=False)
+    )
+
+def slot_exists(db: Session, doctor_id: int, slot_date: date, start_time: time) -> bool:
+    return db.query(Slot.id).filter(
+        Slot.doctor_id == doctor_id,
+        Slot.slot_date == slot_date,
+        Slot.start_time == start_time
+    ).first() is not None
+
+def sync_appointment_slot(db: Session, appointment: Appointment, previous_status: str) -> bool:
+    """
+    Reflect an appointment status change in its slot: cancelling frees the
+    slot, re-activating a cancelled appointment claims it again. Returns False
+    if the slot has been booked by someone else in the meantime.
+    """
+    if not covers(appointment.appointment_date):
+        return True
+    was_active = previous_status != AppointmentStatus.CANCELLED
+    is_active = appointment.status != AppointmentStatus.CANCELLED
+    if was_active and not is_active:
+        release_slot(db, appointment.doctor_id, appointment.appointment_date, appointment.start_time)
+    elif is_active and not was_active:
+        return claim_slot(db, appointment.doctor_id, appointment.appointment_date, appointment.start_time)
+    return True
+
+def _time_slots(rows: Iterable) -> List[TimeSlot]:
+    return [
+        TimeSlot.model_construct(start_time=row.start_time, end_time=row.end_time, is_available=row.is_available)
+        for row in rows
+    ]
+
+def read_day_slots(db: Session, doctor_id: int, check_date: date) -> List[TimeSlot]:
+    """A doctor's slots on one date, with a single lookup on the slots index"""
+    return _time_slots(
+        db.query(Slot.start_time, Slot.end_time, Slot.is_available).filter(
+            Slot.doctor_id == doctor_id,
+            Slot.slot_date == check_date
+        ).order_by(Slot.start_time)
+    )
+
+def read_range_slots(db: Session, doctor_id: int, start_date: date, end_date: date) -> Dict[date, List[TimeSlot]]:
+    """A doctor's slots for every date in a range (inclusive), grouped by date"""
+    rows_by_date: Dict[date, list] = {}
+    for row in db.query(Slot.slot_date, Slot.start_time, Slot.end_time, Slot.is_available).filter(
+        Slot.doctor_id == doctor_id,
+        Slot.slot_date >= start_date,
+        Slot.slot_date <= end_date
+    ).order_by(Slot.slot_date, Slot.start_time):
+        rows_by_date.setdefault(row.slot_date, []).append(row)
+    return {slot_date: _time_slots(rows) for slot_date, rows in rows_by_date.items()}
+
+def find_free_slots(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    limit: int,
+    doctor_ids: Optional[List[int]] = None
+) -> list:
+    """
+    The earliest free slots of active doctors between two dates (inclusive),
+    as rows of doctor_id, full_name, slot_date, start_time and end_time.
+    Slots that have already started today are skipped.
+    """
+    now = datetime.now()
+    query = db.query(
+        Slot.doctor_id, User.full_name, Slot.slot_date, Slot.start_time, Slot.end_time
+    ).join(
+        User, Slot.doctor_id == User.id
+    ).filter(
+        Slot.slot_date >= start_date,
+        Slot.slot_date <= end_date,
+        Slot.is_available == True,
+        User.is_active == True,
+        tuple_(Slot.slot_date, Slot.start_time) > tuple_(now.date(), now.time())
+    )
+    if doctor_ids:
+        query = query.filter(Slot.doctor_id.in_(doctor_ids))
+    return query.order_by(Slot.slot_date, Slot.start_time, Slot.doctor_id).limit(limit).all()
+
+def roll_forward_slots(db: Session, today: Optional[date] = None) -> dict:
+    """
+    Move the horizon forward: delete the slots of past dates and materialize
+    every window up to the end of the horizon. Commits.
+    """
+    today = today or date.today()
+    end_date = today + timedelta(days=SLOT_HORIZON_DAYS + HORIZON_MARGIN_DAYS - 1)
+    deleted = db.execute(delete(Slot).where(Slot.slot_date < today)).rowcount
+    # Commit the cleanup on its own, so a failed insert below cannot undo it
+    db.commit()
+    try:
+        created = materialize_slots(db, today, end_date)
+        db.commit()
+    except IntegrityError:
+        # Another worker materialized the same days concurrently; its rows stand
+        db.rollback()
+        created = 0
+    return {"deleted": deleted, "created": created, "through": end_date.isoformat()}
+
+async def run_roll_forward_job():
+    """
+    Roll the slot horizon forward now and then shortly after every midnight,
+    until cancelled. Every worker runs the job, but only the one holding the
+    "roll_forward" lease does the work.
+    """
+    from app.database.database import SessionLocal
+
+    def roll_forward():
+        with SessionLocal() as db:
+            if not acquire_lease(db, "roll_forward", ROLL_FORWARD_LEASE_SECONDS):
+                return None
+            return roll_forward_slots(db)
+
+    while True:
+        try:
+            result = await run_in_threadpool(roll_forward)
+            if result is not None:
+                logger.info("Slot horizon rolled forward: %s", result)
+        except Exception:
+            logger.exception("Rolling the slot horizon forward failed")
+        tomorrow = datetime.combine(date.today() + timedelta(days=1), time(0, 1))
+        await asyncio.sleep((tomorrow - datetime.now()).total_seconds())
+
+def main() -> int:
+    """Roll the materialized slot horizon forward, e.g. from a daily cron job"""
+    from app.database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--rebuild", action="store_true", help="Delete every materialized slot and rebuild the horizon")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.rebuild:
+            db.execute(delete(Slot))
+        result = roll_forward_slots(db)
+    print(f"Deleted {result['deleted']} past slots, created {result['created']} slots through {result['through']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Hot-path latency as appointment history grows, with and without archiving.
+
+For each history length, seeds a fresh SQLite database with that many years
+of past appointments plus the coming weeks, times slot reads and the
+upcoming appointments listing, then moves everything before the archive
+cutoff into appointments_archive with app.utils.archive and times them
+again. With archiving, the hot table (and these timings) should stay about
+the same size whatever the history length.
+
+Run with: python -m benchmarks.archive [--years 1,3,6] [--iterations 50]
+                                       [--output results.json]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time as timer
+from datetime import date, timedelta
+from typing import Callable, List
+
+from fastapi import Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models.models import Appointment, ArchivedAppointment, User, UserRole
+from app.routers.appointments import get_user_appointments
+from app.utils import archive
+from app.utils.schedule import get_doctor_available_slots, get_doctor_available_slots_range
+from app.utils.slot_cache import slot_cache
+from benchmarks.seed import seed_database
+
+# Days of upcoming appointments seeded after the history
+UPCOMING_DAYS = 60
+
+def median_ms(calls: List[Callable[[], object]]) -> float:
+    durations = []
+    for call in calls:
+        slot_cache.clear()
+        started = timer.perf_counter()
+        call()
+        durations.append((timer.perf_counter() - started) * 1000)
+    return round(statistics.median(durations), 3)
+
+def measure(db, iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    doctors = db.query(User).filter(User.role == UserRole.DOCTOR).all()
+    samples = [
+        (rng.choice(doctors), date.today() + timedelta(days=rng.randrange(1, UPCOMING_DAYS - 28)))
+        for _ in range(iterations)
+    ]
+    return {
+        "hot_rows": db.query(Appointment).count(),
+        "archived_rows": db.query(ArchivedAppointment).count(),
+        "slots (one day, cold)": median_ms([
+            lambda doctor=doctor, day=day: get_doctor_available_slots(db, doctor.id, day) for doctor, day in samples
+        ]),
+        "slots (28 days, cold)": median_ms([
+            lambda doctor=doctor, day=day: get_doctor_available_slots_range(db, doctor.id, day, day + timedelta(days=27))
+            for doctor, day in samples
+        ]),
+        "GET /appointments (doctor, upcoming)": median_ms([
+            lambda doctor=doctor: get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=date.today(),
+                end_date=None, limit=100, cursor=None
+            )
+            for doctor, _ in samples
+        ]),
+        "GET /appointments (doctor, whole history)": median_ms([
+            lambda doctor=doctor: get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=None,
+                end_date=None, limit=100, cursor=None
+            )
+            for doctor, _ in samples
+        ]),
+    }
+
+def run(years: int, iterations: int, seed: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/archive.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with Session() as db:
+            history_days = years * 365
+            seed_database(
+                db, doctors=20, patients=1000, days=history_days + UPCOMING_DAYS,
+                start_date=date.today() - timedelta(days=history_days), seed=seed
+            )
+            db.commit()
+            db.execute(text("ANALYZE"))
+            results = {"before archiving": measure(db, iterations, seed)}
+            started = timer.perf_counter()
+            moved = archive.run_archival(db)
+            db.execute(text("ANALYZE"))
+            results["archival"] = dict(moved, seconds=round(timer.perf_counter() - started, 3))
+            results["after archiving"] = measure(db, iterations, seed)
+        engine.dispose()
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Hot-path latency by history length, with and without archiving")
+    parser.add_argument("--years", default="1,3,6", help="Comma-separated history lengths in years")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = {}
+    for years in [int(value) for value in args.years.split(",")]:
+        report[years] = run(years, args.iterations, args.seed)
+        archival = report[years]["archival"]
+        print(f"{years} year(s) of history: archived {archival['archived']} rows in {archival['seconds']} s")
+        for phase in ("before archiving", "after archiving"):
+            results = report[years][phase]
+            print(f"   {phase}: {results['hot_rows']} hot rows, {results['archived_rows']} archived")
+            for name, value in results.items():
+                if name.endswith("_rows"):
+                    continue
+                print(f"   {value:>10.3f} ms   {name}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Concurrency stress test for booking.
+
+Fires many parallel bookings at a single slot and checks that exactly one of
+them wins, then books distinct slots in parallel to report bookings/sec.
+
+Run with: python -m benchmarks.booking_stress [--workers 32] [--database-url URL]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models.models import DoctorAvailability, User, UserRole
+from app.utils.schedule import SlotUnavailableError, book_appointment
+
+SLOT_MINUTES = 40
+
+def setup(engine, patients: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        doctor = User(email="doctor@example.com", hashed_password="!", full_name="Doctor",
+                      role=UserRole.DOCTOR, is_active=True)
+        db.add(doctor)
+        db.add_all([
+            User(email=f"patient{i}@example.com", hashed_password="!", full_name=f"Patient {i}",
+                 role=UserRole.PATIENT, is_active=True)
+            for i in range(patients)
+        ])
+        db.flush()
+        # Available around the clock so the distinct-slot run has room
+        db.add_all([
+            DoctorAvailability(doctor_id=doctor.id, day_of_week=day, start_time=time(0, 0), end_time=time(23, 59))
+            for day in range(7)
+        ])
+        db.commit()
+        patient_ids = [row.id for row in db.query(User.id).filter(User.role == UserRole.PATIENT)]
+        return Session, doctor.id, patient_ids
+
+def run(Session, workers: int, attempts):
+    """Run book_appointment for each (doctor_id, patient_id, date, start) in parallel"""
+    outcomes = {"booked": 0, "conflict": 0, "error": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(min(workers, len(attempts)))
+
+    def attempt(args):
+        try:
+            barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        with Session() as db:
+            try:
+                book_appointment(db, *args)
+                outcome = "booked"
+            except SlotUnavailableError:
+                outcome = "conflict"
+            except Exception:
+                db.rollback()
+                outcome = "error"
+        with lock:
+            outcomes[outcome] += 1
+
+    started = timer.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(attempt, attempts))
+    return outcomes, timer.perf_counter() - started
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=32, help="Number of parallel booking threads")
+    parser.add_argument("--database-url", help="Database to run against (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "booking_stress.db")
+    connect_args = {"timeout": 30, "check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args, pool_size=args.workers)
+
+    Session, doctor_id, patient_ids = setup(engine, args.workers)
+    booking_date = date.today() + timedelta(days=1)
+
+    # Everyone races for the same slot
+    same_slot = [(doctor_id, patient_id, booking_date, time(9, 20)) for patient_id in patient_ids]
+    outcomes, elapsed = run(Session, args.workers, same_slot)
+    print(f"same slot:      {outcomes} in {elapsed:.3f}s")
+    ok = outcomes["booked"] == 1 and outcomes["error"] == 0
+
+    # Everyone books a different slot
+    distinct_slots = []
+    slots_per_day = (23 * 60 + 59) // SLOT_MINUTES
+    for i, patient_id in enumerate(patient_ids):
+        minute = (i % slots_per_day) * SLOT_MINUTES
+        day = booking_date + timedelta(days=1 + i // slots_per_day)
+        distinct_slots.append((doctor_id, patient_id, day, time(minute // 60, minute % 60)))
+    outcomes, elapsed = run(Session, args.workers, distinct_slots)
+    print(f"distinct slots: {outcomes} in {elapsed:.3f}s ({outcomes['booked'] / elapsed:.1f} bookings/sec)")
+    ok = ok and outcomes["booked"] == len(distinct_slots)
+
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+HTTP load test with a realistic request mix.
+
+Virtual users run scenarios picked at random by weight (browse doctors and
+slots, book, cancel, list appointments, look up the next available slots,
+log in) against the whole FastAPI app, either in process through
+httpx.ASGITransport or against a running server (--base-url). Reports
+throughput, status codes and p50/p95/p99 latency per route, plus the share
+of booking attempts that lost the slot to another user (409).
+
+Run with: python -m benchmarks.load [--duration 30] [--concurrency 32]
+                                    [--mix browse=40,book=20,cancel=10,list=15,next=10,login=5]
+                                    [--base-url http://127.0.0.1:8000] [--output results.json]
+
+In process, the app uses DATABASE_URL if set and otherwise a temporary
+SQLite file; an empty database is seeded with benchmarks.seed first. Against
+a running server, seed its database beforehand with python -m benchmarks.seed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict, List
+
+DEFAULT_MIX = "browse=40,book=20,cancel=10,list=15,next=10,login=5"
+PASSWORD = "load-test-password"
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name.strip()!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+class LoadTest:
+    """Shared state of one run: the client, test accounts, and the collected measurements"""
+
+    def __init__(self, client, rng: random.Random, doctors_in_play: int, days_ahead: int):
+        self.client = client
+        self.rng = rng
+        self.doctors_in_play = doctors_in_play
+        self.days_ahead = days_ahead
+        self.accounts: List[dict] = []
+        self.doctor_ids: List[int] = []
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+        self.bookings = {"attempts": 0, "booked": 0, "conflicts": 0, "no_free_slot": 0}
+
+    async def request(self, method: str, route: str, url: str, account: dict = None, **kwargs):
+        """Send a request and record its latency under the route template `route`"""
+        if account is not None:
+            kwargs.setdefault("headers", {})["Authorization"] = f"Bearer {account['token']}"
+        label = f"{method} {route}"
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        statuses = self.statuses.setdefault(label, {})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return response
+
+    async def setup(self, accounts: int):
+        """Register and log in the patient accounts the virtual users act as"""
+        run_id = uuid.uuid4().hex[:8]
+
+        async def create(i: int):
+            email = f"load-{run_id}-{i}@example.com"
+            response = await self.client.post("/register", json={
+                "email": email, "full_name": f"Load test {i}", "role": "patient", "password": PASSWORD
+            })
+            response.raise_for_status()
+            response = await self.client.post("/token", data={"username": email, "password": PASSWORD})
+            response.raise_for_status()
+            return {"email": email, "token": response.json()["access_token"]}
+
+        self.accounts = list(await asyncio.gather(*(create(i) for i in range(accounts))))
+        response = await self.client.get(
+            "/users/doctors", headers={"Authorization": f"Bearer {self.accounts[0]['token']}"}
+        )
+        response.raise_for_status()
+        self.doctor_ids = [doctor["id"] for doctor in response.json()]
+        if not self.doctor_ids:
+            raise RuntimeError("No doctors found; seed the database first (python -m benchmarks.seed)")
+
+    def pick_doctor(self) -> int:
+        # A few popular doctors get most of the traffic, which is where bookings collide
+        return self.rng.choice(self.doctor_ids[:self.doctors_in_play])
+
+    def pick_date(self) -> date:
+        return date.today() + timedelta(days=self.rng.randint(1, self.days_ahead))
+
+async def browse(test: LoadTest, account: dict):
+    await test.request("GET", "/users/doctors", "/users/doctors", account)
+    doctor_id = test.pick_doctor()
+    await test.request("GET", "/availability/{doctor_id}", f"/availability/{doctor_id}", account)
+    await test.request(
+        "GET", "/appointments/doctor/{doctor_id}/slots", f"/appointments/doctor/{doctor_id}/slots",
+        account, params={"date": test.pick_date().isoformat()}
+    )
+
+async def book(test: LoadTest, account: dict):
+    doctor_id, booking_date = test.pick_doctor(), test.pick_date()
+    response = await test.request(
+        "GET", "/appointments/doctor/{doctor_id}/slots", f"/appointments/doctor/{doctor_id}/slots",
+        account, params={"date": booking_date.isoformat()}
+    )
+    free = [slot for slot in response.json().get("time_slots", []) if slot["is_available"]]
+    if not free:
+        test.bookings["no_free_slot"] += 1
+        return
+    slot = test.rng.choice(free)
+    test.bookings["attempts"] += 1
+    response = await test.request("POST", "/appointments/", "/appointments/", account, json={
+        "doctor_id": doctor_id, "appointment_date": booking_date.isoformat(), "start_time": slot["start_time"]
+    })
+    if response.status_code == 200:
+        test.bookings["booked"] += 1
+    elif response.status_code == 409:
+        test.bookings["conflicts"] += 1
+
+async def cancel(test: LoadTest, account: dict):
+    response = await test.request(
+        "GET", "/appointments/", "/appointments/", account,
+        params={"start_date": (date.today() + timedelta(days=1)).isoformat(), "limit": 50}
+    )
+    scheduled = [appointment for appointment in response.json() if appointment["status"] == "scheduled"]
+    if scheduled:
+        appointment_id = test.rng.choice(scheduled)["id"]
+        await test.request(
+            "PATCH", "/appointments/{appointment_id}", f"/appointments/{appointment_id}",
+            account, json={"status": "cancelled"}
+        )
+
+async def list_appointments(test: LoadTest, account: dict):
+    response = await test.request("GET", "/appointments/", "/appointments/", account, params={"limit": 100})
+    appointments = response.json()
+    if appointments:
+        appointment_id = test.rng.choice(appointments)["id"]
+        await test.request("GET", "/appointments/{appointment_id}", f"/appointments/{appointment_id}", account)
+
+async def next_available(test: LoadTest, account: dict):
+    await test.request(
+        "GET", "/appointments/next-available", "/appointments/next-available", account, params={"limit": 10}
+    )
+
+async def login(test: LoadTest, account: dict):
+    await test.request("POST", "/token", "/token", data={"username": account["email"], "password": PASSWORD})
+
+SCENARIOS = {
+    "browse": browse,
+    "book": book,
+    "cancel": cancel,
+    "list": list_appointments,
+    "next": next_available,
+    "login": login,
+}
+
+async def run_load(test: LoadTest, mix: Dict[str, float], concurrency: int, duration: float) -> dict:
+    names, weights = list(mix), list(mix.values())
+    scenario_counts = {name: 0 for name in names}
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(account: dict):
+        while time.perf_counter() < deadline:
+            name = test.rng.choices(names, weights)[0]
+            scenario_counts[name] += 1
+            try:
+                await SCENARIOS[name](test, account)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        virtual_user(test.accounts[i % len(test.accounts)]) for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for label, latencies in sorted(test.latencies.items()):
+        latencies.sort()
+        routes[label] = {
+            "requests": len(latencies),
+            "per_sec": round(len(latencies) / elapsed, 2),
+            "statuses": {str(code): count for code, count in sorted(test.statuses[label].items())},
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    attempts = test.bookings["attempts"]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "requests_per_sec": round(total / elapsed, 2),
+        "scenarios": scenario_counts,
+        "client_errors": errors,
+        "bookings": {
+            **test.bookings,
+            "conflict_rate": round(test.bookings["conflicts"] / attempts, 4) if attempts else 0.0,
+        },
+        "routes": routes,
+    }
+
+def print_report(report: dict):
+    print(f"{report['requests']} requests in {report['elapsed_s']}s ({report['requests_per_sec']} req/s)")
+    print(f"{'route':<48} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for label, route in report["routes"].items():
+        print(
+            f"{label:<48} {route['requests']:>7} {route['per_sec']:>8} {route['p50_ms']:>8} "
+            f"{route['p95_ms']:>8} {route['p99_ms']:>8}  {route['statuses']}"
+        )
+    bookings = report["bookings"]
+    print(
+        f"bookings: {bookings['attempts']} attempts, {bookings['booked']} booked, "
+        f"{bookings['conflicts']} conflicts ({bookings['conflict_rate']:.1%}), "
+        f"{bookings['no_free_slot']} found no free slot"
+    )
+    if report["client_errors"]:
+        print(f"client errors: {report['client_errors']}")
+
+async def run(args) -> dict:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+        app_cleanup = None
+    else:
+        from app.database.database import SessionLocal, dispose_async_engine
+        from app.database.schema import prepare_database
+        from app.main import app
+        from app.models.models import User, UserRole
+        from app.utils.hashing import password_pool
+        from benchmarks.seed import seed_database
+
+        # The in-process transport does not run the app's lifespan
+        prepare_database()
+        with SessionLocal() as db:
+            if db.query(User.id).filter(User.role == UserRole.DOCTOR).first() is None:
+                print("Seeding the database", file=sys.stderr)
+                seed_database(db, doctors=args.doctors, patients=200, days=2 * args.days_ahead)
+
+        async def app_cleanup():
+            password_pool.shutdown()
+            await dispose_async_engine()
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=60)
+
+    try:
+        test = LoadTest(client, rng, args.doctors_in_play, args.days_ahead)
+        print(f"Registering {args.accounts} test accounts", file=sys.stderr)
+        await test.setup(args.accounts)
+        print(f"Running for {args.duration}s with {args.concurrency} virtual users", file=sys.stderr)
+        report = await run_load(test, mix, args.concurrency, args.duration)
+    finally:
+        await client.aclose()
+        if app_cleanup is not None:
+            await app_cleanup()
+
+    report["config"] = {
+        "target": args.base_url or "in-process",
+        "mix": mix,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "doctors_in_play": args.doctors_in_play,
+        "days_ahead": args.days_ahead,
+    }
+    return report
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load for")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights as name=weight pairs")
+    parser.add_argument("--accounts", type=int, default=10, help="Patient accounts shared by the virtual users")
+    parser.add_argument("--doctors-in-play", type=int, default=5, help="Number of doctors users book with")
+    parser.add_argument("--days-ahead", type=int, default=14, help="Users book up to this many days ahead")
+    parser.add_argument("--doctors", type=int, default=20, help="Doctors to seed into an empty in-process database")
+    parser.add_argument("--base-url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Run against a throwaway SQLite database unless one is configured
+    if not args.base_url and "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db")
+        os.environ.setdefault("SCHEMA_CHECK", "create")
+    # Archival would compete with the measured requests
+    os.environ.setdefault("APPOINTMENT_ARCHIVE_JOB", "false")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
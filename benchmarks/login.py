@@ -0,0 +1,117 @@
+"""
+Login throughput benchmark.
+
+Drives POST /token on the in-process ASGI app with concurrent logins while a
+background client keeps hitting GET /users/me, once with bcrypt running in
+FastAPI's threadpool and once through the password hashing process pool.
+Reports logins/sec and the latency of the ordinary requests served meanwhile.
+
+Run with: python -m benchmarks.login [--logins 100] [--concurrency 32] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+async def run_scenario(app, hashing, pool, users, logins: int, concurrency: int, token: str):
+    import httpx
+
+    hashing.password_pool = pool
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # Warm up the pool (spawning worker processes) outside the measurement
+        await client.post("/token", data={"username": users[0], "password": "password"})
+
+        queue = asyncio.Queue()
+        for i in range(logins):
+            queue.put_nowait(users[i % len(users)])
+        outcomes = {"ok": 0, "busy": 0, "error": 0}
+        ping_latencies = []
+        done = asyncio.Event()
+
+        async def login_worker():
+            while not queue.empty():
+                email = queue.get_nowait()
+                response = await client.post("/token", data={"username": email, "password": "password"})
+                if response.status_code == 200:
+                    outcomes["ok"] += 1
+                elif response.status_code == 503:
+                    outcomes["busy"] += 1
+                else:
+                    outcomes["error"] += 1
+
+        async def ping_worker():
+            headers = {"Authorization": f"Bearer {token}"}
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/users/me", headers=headers)
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        ping = asyncio.create_task(ping_worker())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ping
+
+    pool.shutdown()
+    return {
+        "logins_per_sec": round(outcomes["ok"] / elapsed, 1),
+        "outcomes": outcomes,
+        "elapsed_s": round(elapsed, 3),
+        "other_requests_p50_ms": round(statistics.median(ping_latencies) * 1000, 2) if ping_latencies else 0.0,
+        "other_requests_p99_ms": round(percentile(ping_latencies, 0.99) * 1000, 2),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100, help="Number of logins per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent login clients")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Hashing pool processes")
+    parser.add_argument("--users", type=int, default=20, help="Number of distinct accounts")
+    args = parser.parse_args()
+
+    # Run against a throwaway SQLite database unless one is configured
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "login.db")
+        os.environ.setdefault("SCHEMA_CHECK", "create")
+
+    from app.database.database import SessionLocal
+    from app.database.schema import prepare_database
+    from app.main import app
+    from app.models.models import User, UserRole
+    from app.utils import hashing
+    from app.utils.auth import create_access_token
+
+    users = [f"login{i}@example.com" for i in range(args.users)]
+    prepare_database()
+    hashed = hashing.hash_password("password")
+    with SessionLocal() as db:
+        existing = {row.email for row in db.query(User.email).filter(User.email.in_(users))}
+        db.add_all([
+            User(email=email, hashed_password=hashed, full_name=email, role=UserRole.PATIENT, is_active=True)
+            for email in users if email not in existing
+        ])
+        db.commit()
+        user_id = db.query(User.id).filter(User.email == users[0]).scalar()
+    token = create_access_token({"sub": users[0], "user_id": user_id, "role": "patient"})
+
+    scenarios = {
+        "threadpool": hashing.PasswordHashPool(workers=0, max_pending=args.logins),
+        "process_pool": hashing.PasswordHashPool(workers=args.workers, max_pending=args.logins),
+    }
+    for name, pool in scenarios.items():
+        result = asyncio.run(run_scenario(app, hashing, pool, users, args.logins, args.concurrency, token))
+        print(f"{name:13} {result}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for slot availability marking.
+
+Compares the original nested slot x appointment loop with the sorted
+sweep in app.utils.overlap and the minute bitmap in app.utils.bitmap
+(free start minutes found once, then one bit test per slot, as the
+"bitmap" slot engine does) at 10, 100 and 1000 appointments per day.
+
+Run with: python -m benchmarks.overlap
+"""
+import random
+from collections import namedtuple
+import timeit
+from datetime import date, datetime, time, timedelta
+from typing import List
+
+from app.utils.bitmap import MINUTES_PER_DAY, DayBitmap, minute_flags, minute_mask, time_to_minute
+from app.utils.overlap import BusyIntervals, Interval
+
+SLOT_MINUTES = 1
+BusyInterval = namedtuple("BusyInterval", ["start_time", "end_time"])
+DAY_START = datetime.combine(date.today(), time(0, 0))
+
+def make_slots(slot_minutes: int = SLOT_MINUTES) -> List[Interval]:
+    """Back-to-back slots covering the whole day"""
+    slots = []
+    for minute in range(0, 24 * 60 - slot_minutes + 1, slot_minutes):
+        start = DAY_START + timedelta(minutes=minute)
+        slots.append((start.time(), (start + timedelta(minutes=slot_minutes)).time()))
+    return slots
+
+def make_appointments(count: int, rng: random.Random) -> List[Interval]:
+    """Random one-minute appointments spread over the day"""
+    minutes = rng.sample(range(24 * 60 - 1), count)
+    return [
+        ((DAY_START + timedelta(minutes=m)).time(), (DAY_START + timedelta(minutes=m + 1)).time())
+        for m in minutes
+    ]
+
+def nested_loop(slots: List[Interval], appointments: List[Interval]) -> List[bool]:
+    """The original O(slots x appointments) marking"""
+    flags = []
+    for slot_start, slot_end in slots:
+        is_available = True
+        for appt_start, appt_end in appointments:
+            if slot_start < appt_end and slot_end > appt_start:
+                is_available = False
+                break
+        flags.append(is_available)
+    return flags
+
+def sweep(slots: List[Interval], appointments: List[Interval]) -> List[bool]:
+    return BusyIntervals(appointments).mark_slots(slots)
+
+def bitmap(slots: List[Interval], appointments: List[Interval]) -> List[bool]:
+    day = DayBitmap.from_schedule(
+        appointments=[BusyInterval(start, end) for start, end in appointments]
+    )
+    # The whole day is one availability window
+    day.available = minute_mask(0, MINUTES_PER_DAY)
+    free_starts = minute_flags(day.free_start_mask(SLOT_MINUTES))
+    return [free_starts[time_to_minute(start)] == "1" for start, _ in slots]
+
+def main():
+    rng = random.Random(42)
+    slots = make_slots()
+    print(f"{'appointments':>12} {'nested (ms)':>12} {'sweep (ms)':>12} {'bitmap (ms)':>12}")
+    for count in (10, 100, 1000):
+        appointments = make_appointments(count, rng)
+        expected = nested_loop(slots, appointments)
+        assert expected == sweep(slots, appointments) == bitmap(slots, appointments)
+
+        repeat = 5
+        nested = min(timeit.repeat(lambda: nested_loop(slots, appointments), number=1, repeat=repeat))
+        swept = min(timeit.repeat(lambda: sweep(slots, appointments), number=1, repeat=repeat))
+        bits = min(timeit.repeat(lambda: bitmap(slots, appointments), number=1, repeat=repeat))
+        print(f"{count:>12} {nested * 1000:>12.2f} {swept * 1000:>12.2f} {bits * 1000:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Query budget check for every route in app.routers.
+
+Seeds a SQLite database with several doctors, patients and appointments,
+calls each route once through the app with the user, token and slot caches
+cleared (the worst case), and counts the SQL statements it issues with
+app.utils.query_counter. Exits with a non-zero status if any route exceeds
+its budget in QUERY_BUDGETS, or if a route has no budget declared, so an
+N+1 (e.g. touching User.appointments_as_doctor per row) or a new route
+without a budget fails the check.
+
+Run with: python -m benchmarks.query_budgets [--verbose]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# Maximum SQL statements per request, by route. Keep these tight: raise a
+# budget only together with the change that needs the extra round trip.
+QUERY_BUDGETS = {
+    "POST /register": 3,
+    "POST /token": 1,
+    "GET /users/me": 1,
+    "GET /users/doctors": 2,
+    "GET /users/{user_id}": 2,
+    "POST /availability/": 4,
+    "POST /availability/bulk": 4,
+    "GET /availability/": 2,
+    "GET /availability/{doctor_id}": 3,
+    "DELETE /availability/{availability_id}": 3,
+    "GET /appointments/doctor/{doctor_id}/slots": 4,
+    "GET /appointments/doctor/{doctor_id}/slots/range": 4,
+    "GET /appointments/doctor/{doctor_id}/slots/events": 4,
+    "GET /appointments/next-available": 3,
+    "POST /appointments/": 7,
+    # Listings reaching back past the archive cutoff also read the archive table
+    "GET /appointments/": 3,
+    "GET /appointments/export": 3,
+    # The change feed also lists appointments moved to the archive
+    "GET /appointments/changes": 3,
+    "GET /appointments/{appointment_id}": 2,
+    "PATCH /appointments/{appointment_id}": 4,
+    "GET /calendar/token": 2,
+    "POST /calendar/token": 3,
+    "GET /calendar/doctors/{doctor_id}.ics": 3,
+}
+
+PASSWORD = "budget-password"
+
+def router_routes(app):
+    """'METHOD /path' for every route defined in app.routers"""
+    routes = set()
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is not None and route.endpoint.__module__.startswith("app.routers"):
+            routes.update(f"{method} {route.path}" for method in route.methods)
+    return routes
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Print the statements of every route")
+    args = parser.parse_args()
+
+    # A throwaway database, and cheap hashing so registering and logging in stay fast
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_budgets.db")
+    os.environ["SCHEMA_CHECK"] = "create"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    # Slot event streams end right after their initial snapshot
+    os.environ["SLOT_EVENTS_MAX_SECONDS"] = "0"
+    # Archival would add its own statements to whichever request is being counted
+    os.environ["APPOINTMENT_ARCHIVE_JOB"] = "false"
+
+    from fastapi.testclient import TestClient
+
+    from app.database.database import DB_MODE, SessionLocal, get_async_engine, get_engine
+    from app.database.schema import prepare_database
+    from app.main import app
+    from app.models.models import Appointment, User, UserRole
+    from app.utils.auth import create_access_token, create_calendar_token, token_cache, user_cache
+    from app.utils.ical import calendar_cache
+    from app.utils.query_counter import QueryCounter
+    from app.utils.schedule import get_doctor_available_slots
+    from app.utils.slot_cache import slot_cache
+    from benchmarks.seed import seed_database
+
+    prepare_database()
+    with SessionLocal() as db:
+        seed_database(db, doctors=5, patients=20, days=60, start_date=date.today() - timedelta(days=30))
+        doctor = db.query(User).filter(User.role == UserRole.DOCTOR).first()
+        patient = db.query(User).filter(User.role == UserRole.PATIENT).first()
+        appointment_id = db.query(Appointment.id).filter(
+            Appointment.patient_id == patient.id, Appointment.status == "scheduled"
+        ).first().id
+        booking_date = date.today() + timedelta(days=1)
+        while booking_date.weekday() >= 5:
+            booking_date += timedelta(days=1)
+        free_slot = next(
+            slot for slot in get_doctor_available_slots(db, doctor.id, booking_date).time_slots if slot.is_available
+        )
+
+    def auth(user):
+        token = create_access_token({"sub": user.email, "user_id": user.id, "role": user.role.value})
+        return {"Authorization": f"Bearer {token}"}
+
+    as_doctor, as_patient = auth(doctor), auth(patient)
+    today = date.today().isoformat()
+    new_email = "budget-user@example.com"
+
+    # (route, url, request kwargs, expected status); later calls use ids created by earlier ones
+    calls = [
+        ("POST /register", "/register", {"json": {
+            "email": new_email, "full_name": "Budget", "role": "patient", "password": PASSWORD
+        }}, 200),
+        ("POST /token", "/token", {"data": {"username": new_email, "password": PASSWORD}}, 200),
+        ("GET /users/me", "/users/me", {"headers": as_patient}, 200),
+        ("GET /users/doctors", "/users/doctors", {"headers": as_patient}, 200),
+        ("GET /users/{user_id}", f"/users/{doctor.id}", {"headers": as_patient}, 200),
+        ("POST /availability/", "/availability/", {"headers": as_doctor, "json": {
+            "day_of_week": 5, "start_time": "08:00", "end_time": "09:00"
+        }}, 200),
+        ("POST /availability/bulk", "/availability/bulk", {"headers": as_doctor, "json": {"windows": [
+            {"day_of_week": 6, "start_time": "08:00", "end_time": "09:00"},
+            {"day_of_week": 6, "start_time": "10:00", "end_time": "11:00"},
+        ]}}, 200),
+        ("GET /availability/", "/availability/", {"headers": as_doctor}, 200),
+        ("GET /availability/{doctor_id}", f"/availability/{doctor.id}", {"headers": as_patient}, 200),
+        ("DELETE /availability/{availability_id}", None, {"headers": as_doctor}, 204),
+        ("GET /appointments/doctor/{doctor_id}/slots", f"/appointments/doctor/{doctor.id}/slots", {
+            "headers": as_patient, "params": {"date": booking_date.isoformat()}
+        }, 200),
+        ("GET /appointments/doctor/{doctor_id}/slots/range", f"/appointments/doctor/{doctor.id}/slots/range", {
+            "headers": as_patient,
+            "params": {"start_date": today, "end_date": (date.today() + timedelta(days=27)).isoformat()},
+        }, 200),
+        ("GET /appointments/doctor/{doctor_id}/slots/events", f"/appointments/doctor/{doctor.id}/slots/events", {
+            "headers": as_patient, "params": {"date": booking_date.isoformat()}
+        }, 200),
+        ("GET /appointments/next-available", "/appointments/next-available", {"headers": as_patient}, 200),
+        ("POST /appointments/", "/appointments/", {"headers": as_patient, "json": {
+            "doctor_id": doctor.id, "appointment_date": booking_date.isoformat(),
+            "start_time": free_slot.start_time.isoformat()
+        }}, 200),
+        ("GET /appointments/", "/appointments/", {"headers": as_patient}, 200),
+        ("GET /appointments/export", "/appointments/export", {"headers": as_doctor}, 200),
+        ("GET /appointments/changes", "/appointments/changes", {"headers": as_doctor}, 200),
+        ("GET /appointments/{appointment_id}", f"/appointments/{appointment_id}", {"headers": as_patient}, 200),
+        ("PATCH /appointments/{appointment_id}", f"/appointments/{appointment_id}", {
+            "headers": as_patient, "json": {"status": "cancelled"}
+        }, 200),
+        ("GET /calendar/token", "/calendar/token", {"headers": as_doctor}, 200),
+        ("GET /calendar/doctors/{doctor_id}.ics", f"/calendar/doctors/{doctor.id}.ics", {
+            "params": {"token": create_calendar_token(doctor.id)}
+        }, 200),
+        # Revokes the token above, so it runs after the feed
+        ("POST /calendar/token", "/calendar/token", {"headers": as_doctor}, 200),
+    ]
+
+    engines = [get_engine(), get_async_engine()] if DB_MODE == "async" else [get_engine()]
+    failures = 0
+    exercised = set()
+    created_availability_id = None
+
+    with TestClient(app) as client:
+        for route, url, kwargs, expected_status in calls:
+            if url is None:
+                url = f"/availability/{created_availability_id}"
+            user_cache.clear()
+            token_cache.clear()
+            slot_cache.clear()
+            calendar_cache.clear()
+
+            with QueryCounter(*engines) as counter:
+                response = client.request(route.split(" ")[0], url, **kwargs)
+            exercised.add(route)
+
+            if route == "POST /availability/":
+                created_availability_id = response.json()["id"]
+
+            budget = QUERY_BUDGETS.get(route)
+            if response.status_code != expected_status:
+                status = f"HTTP {response.status_code}"
+            elif budget is None:
+                status = "NO BUDGET"
+            elif counter.count > budget:
+                status = "OVER"
+            else:
+                status = "ok"
+            failures += status != "ok"
+            print(f"   {status:10} {counter.count:>3} / {budget if budget is not None else '-':<3} {route}")
+            if args.verbose or status != "ok":
+                for statement, _ in counter.statements:
+                    print("                  " + " ".join(statement.split())[:150])
+
+    for route in sorted(router_routes(app) - exercised):
+        print(f"   {'NOT RUN':10}         {route}")
+        failures += 1
+
+    if failures:
+        print(f"{failures} route(s) failed the query budget check")
+        return 1
+    print("All routes are within their query budgets")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Query plan regression check for the scheduling hot paths.
+
+Seeds a SQLite database, runs the queries issued by app.utils.schedule and
+app.routers.appointments / app.routers.availability, as well as the
+materialized slot reads of app.utils.slot_table and the archival job of
+app.utils.archive, and runs EXPLAIN QUERY PLAN on every captured statement.
+Exits with a non-zero status if any of them falls back to a full scan of the
+appointments, appointments_archive, doctor_availability or slots tables.
+
+Run with: python -m benchmarks.query_plans
+"""
+import re
+import sys
+from datetime import date, datetime, time, timedelta
+
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models.models import User, UserRole
+from app.routers.appointments import get_appointment, get_appointment_changes, get_user_appointments
+from app.routers.availability import create_availability, get_specific_doctor_availabilities
+from app.schemas.schemas import DoctorAvailabilityCreate
+from app.utils import archive, slot_table
+from app.utils.pagination import encode_change_cursor, encode_cursor
+from app.utils.schedule import (
+    book_appointment,
+    find_next_available_slots,
+    get_doctor_available_slots,
+    get_doctor_available_slots_range,
+)
+from benchmarks.seed import seed_database
+
+CHECKED_TABLES = ("appointments", "appointments_archive", "doctor_availability", "slots")
+FULL_SCAN = re.compile(r"\bSCAN (\w+)")
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return [row[-1] for row in rows]
+
+def main() -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        seed_database(db, doctors=50, patients=500, days=120)
+        slot_table.materialize_slots(db, date.today(), date.today() + timedelta(days=55))
+        db.commit()
+        db.execute(text("ANALYZE"))
+
+    target_date = date.today() + timedelta(days=7)
+    while target_date.weekday() != 0:
+        target_date += timedelta(days=1)
+
+    with Session() as db:
+        doctor = db.query(User).filter(User.role == UserRole.DOCTOR).first()
+        patient = db.query(User).filter(User.role == UserRole.PATIENT).first()
+        new_window = DoctorAvailabilityCreate(day_of_week=5, start_time=time(9, 0), end_time=time(12, 0))
+
+        scenarios = {
+            "get_doctor_available_slots": lambda: get_doctor_available_slots(db, doctor.id, target_date),
+            "get_doctor_available_slots_range": lambda: get_doctor_available_slots_range(
+                db, doctor.id, target_date, target_date + timedelta(days=27)
+            ),
+            # Scanning every doctor's weekly availability is inherent to this search
+            "find_next_available_slots": lambda: find_next_available_slots(db, target_date, limit=20),
+            "book_appointment": lambda: book_appointment(db, doctor.id, patient.id, target_date, time(16, 20)),
+            "get_user_appointments (doctor)": lambda: get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=target_date,
+                end_date=target_date + timedelta(days=30), limit=100, cursor=None
+            ),
+            "get_user_appointments (patient)": lambda: get_user_appointments(
+                request=None, response=Response(), db=db, current_user=patient, start_date=None, end_date=None, limit=100, cursor=None
+            ),
+            "get_user_appointments (doctor, next page)": lambda: get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=None, end_date=None, limit=100,
+                cursor=encode_cursor(target_date, time(9, 0), 1)
+            ),
+            "get_appointment_changes (doctor)": lambda: get_appointment_changes(
+                db=db, current_user=doctor, cursor=encode_change_cursor(datetime.combine(target_date, time(0, 0)), 1),
+                limit=500
+            ),
+            "get_appointment_changes (patient, from the start)": lambda: get_appointment_changes(
+                db=db, current_user=patient, cursor=None, limit=500
+            ),
+            "get_specific_doctor_availabilities": lambda: get_specific_doctor_availabilities(
+                doctor.id, request=None, response=Response(), db=db, current_user=patient, if_none_match=None
+            ),
+            "create_availability": lambda: create_availability(
+                availability=new_window, db=db, current_user=doctor
+            ),
+            "slot_table.read_day_slots": lambda: slot_table.read_day_slots(db, doctor.id, target_date),
+            "slot_table.read_range_slots": lambda: slot_table.read_range_slots(
+                db, doctor.id, target_date, target_date + timedelta(days=27)
+            ),
+            "slot_table.find_free_slots": lambda: slot_table.find_free_slots(
+                db, target_date, target_date + timedelta(days=13), limit=20
+            ),
+            "slot_table.slot_exists": lambda: slot_table.slot_exists(db, doctor.id, target_date, time(9, 0)),
+            "get_user_appointments (doctor, across the archive)": lambda: get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=date(2000, 1, 1),
+                end_date=None, limit=100, cursor=None
+            ),
+            "get_appointment (archived)": lambda: get_appointment(0, db=db, current_user=patient),
+            # Moves rows, so it runs last
+            "archive.run_archival": lambda: archive.run_archival(db, today=target_date),
+        }
+        allowed_scans = {"find_next_available_slots": {"doctor_availability"}}
+
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        failures = 0
+        for name, run in scenarios.items():
+            statements.clear()
+            try:
+                run()
+            except ValueError:
+                # A rejected booking still issued all of its lookups
+                db.rollback()
+            except HTTPException:
+                # So did a lookup of a missing appointment
+                pass
+            captured = list(statements)
+
+            print(f"== {name}")
+            for statement, parameters in captured:
+                for detail in explain(engine, statement, parameters):
+                    match = FULL_SCAN.search(detail)
+                    regressed = (
+                        match is not None
+                        and match.group(1) in CHECKED_TABLES
+                        and match.group(1) not in allowed_scans.get(name, set())
+                    )
+                    failures += regressed
+                    print(f"   {'FULL SCAN' if regressed else 'ok':9} {detail}")
+
+    if failures:
+        print(f"{failures} query plan(s) regressed to a full table scan")
+        return 1
+    print("All checked queries use an index")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Synthetic data for benchmarks and query plan checks.
+
+Can also seed a database from the command line, e.g. for load tests:
+
+    python -m benchmarks.seed --database-url sqlite:///bench.db --doctors 100 --years 2
+"""
+import argparse
+import random
+import sys
+from datetime import date, time, timedelta
+from typing import Sequence, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.models import Appointment, DoctorAvailability, User, UserRole
+
+WORKING_DAYS = range(5)  # Monday to Friday
+MORNING = (time(9, 0), time(12, 20))
+AFTERNOON = (time(13, 0), time(17, 0))
+SLOT_MINUTES = 40
+
+# Appointments are written in batches so years of history do not sit in memory at once
+INSERT_BATCH_SIZE = 20000
+
+def seed_database(
+    db: Session,
+    doctors: int = 20,
+    patients: int = 100,
+    days: int = 90,
+    start_date: date = None,
+    fill_ratio: float = 0.5,
+    cancel_ratio: float = 0.1,
+    seed: int = 42,
+    working_days: Sequence[int] = WORKING_DAYS,
+    windows: Sequence[Tuple[time, time]] = (MORNING, AFTERNOON)
+) -> dict:
+    """
+    Insert doctors with the same weekly schedule (`windows` on each of
+    `working_days`), patients, and appointments covering `days` days from
+    `start_date`. Returns the number of rows inserted per table.
+
+    `fill_ratio` is the share of slots booked and `cancel_ratio` the share of
+    those bookings that are cancelled.
+    """
+    rng = random.Random(seed)
+    start_date = start_date or date.today() - timedelta(days=days // 2)
+
+    doctor_rows = [
+        {
+            "email": f"doctor{i}@example.com",
+            "hashed_password": "!",
+            "full_name": f"Doctor {i}",
+            "role": UserRole.DOCTOR,
+            "is_active": True,
+        }
+        for i in range(doctors)
+    ]
+    patient_rows = [
+        {
+            "email": f"patient{i}@example.com",
+            "hashed_password": "!",
+            "full_name": f"Patient {i}",
+            "role": UserRole.PATIENT,
+            "is_active": True,
+        }
+        for i in range(patients)
+    ]
+    db.bulk_insert_mappings(User, doctor_rows + patient_rows)
+    db.flush()
+
+    doctor_ids = [row.id for row in db.query(User.id).filter(User.role == UserRole.DOCTOR).order_by(User.id)]
+    patient_ids = [row.id for row in db.query(User.id).filter(User.role == UserRole.PATIENT).order_by(User.id)]
+
+    db.bulk_insert_mappings(DoctorAvailability, [
+        {"doctor_id": doctor_id, "day_of_week": day, "start_time": start, "end_time": end}
+        for doctor_id in doctor_ids
+        for day in working_days
+        for start, end in windows
+    ])
+
+    slot_starts = []
+    for start, end in windows:
+        minute = start.hour * 60 + start.minute
+        while minute + SLOT_MINUTES <= end.hour * 60 + end.minute:
+            slot_starts.append(minute)
+            minute += SLOT_MINUTES
+
+    appointment_rows = []
+    appointments = 0
+    for offset in range(days):
+        current_date = start_date + timedelta(days=offset)
+        if current_date.weekday() not in working_days:
+            continue
+        for doctor_id in doctor_ids:
+            for minute in slot_starts:
+                if rng.random() >= fill_ratio:
+                    continue
+                appointment_rows.append({
+                    "doctor_id": doctor_id,
+                    "patient_id": rng.choice(patient_ids),
+                    "appointment_date": current_date,
+                    "start_time": time(minute // 60, minute % 60),
+                    "end_time": time((minute + SLOT_MINUTES) // 60, (minute + SLOT_MINUTES) % 60),
+                    "status": "cancelled" if rng.random() < cancel_ratio else "scheduled",
+                })
+        if len(appointment_rows) >= INSERT_BATCH_SIZE:
+            db.bulk_insert_mappings(Appointment, appointment_rows)
+            appointments += len(appointment_rows)
+            appointment_rows = []
+    db.bulk_insert_mappings(Appointment, appointment_rows)
+    appointments += len(appointment_rows)
+    db.commit()
+
+    return {
+        "doctors": len(doctor_ids),
+        "patients": len(patient_ids),
+        "availability_windows": len(doctor_ids) * len(working_days) * len(windows),
+        "appointments": appointments,
+    }
+
+def main() -> int:
+    from app.database.database import Base
+
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic doctors, schedules and appointments")
+    parser.add_argument("--database-url", required=True, help="Database to seed; its tables are created if missing")
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--years", type=float, default=1, help="Years of appointment history, centred on today")
+    parser.add_argument("--fill-ratio", type=float, default=0.5)
+    parser.add_argument("--cancel-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        if db.query(User.id).first() is not None:
+            print("The database already contains users; seed an empty database", file=sys.stderr)
+            return 1
+        counts = seed_database(
+            db,
+            doctors=args.doctors,
+            patients=args.patients,
+            days=round(args.years * 365),
+            fill_ratio=args.fill_ratio,
+            cancel_ratio=args.cancel_ratio,
+            seed=args.seed,
+        )
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
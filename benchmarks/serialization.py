@@ -0,0 +1,144 @@
+"""
+Response serialization of large lists.
+
+For each row count, times the appointment list the way FastAPI serves it by
+default (ORM objects, validated against the response_model, encoded with the
+stdlib json module) against the FAST_RESPONSES path in
+app.utils.serialization (plain column rows encoded by pydantic-core, and
+MessagePack when msgpack is installed), and checks that both produce the
+same JSON document. Slot lists, which are built as models rather than
+loaded as rows, are compared the same way.
+
+Run with: python -m benchmarks.serialization [--rows 1000,50000] [--iterations 5]
+                                             [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time as timer
+from datetime import date, datetime, time, timedelta
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic_core import to_json, to_jsonable_python
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models.models import Appointment, User, UserRole
+from app.schemas.schemas import Appointment as AppointmentSchema, TimeSlot
+from app.utils.serialization import msgpack, rows_to_dicts, schema_columns
+
+APPOINTMENT_FIELDS, APPOINTMENT_COLUMNS = schema_columns(AppointmentSchema, Appointment)
+
+# Appointments per day in the generated data
+PER_DAY = 12
+
+def time_call(call: Callable[[], object], iterations: int) -> float:
+    """Median duration of `call` in milliseconds"""
+    durations = []
+    for _ in range(iterations):
+        started = timer.perf_counter()
+        call()
+        durations.append((timer.perf_counter() - started) * 1000)
+    return round(statistics.median(durations), 3)
+
+def default_response(field, content) -> bytes:
+    """What FastAPI does with a route's return value when it has a response_model"""
+    validated = asyncio.run(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return JSONResponse(validated).body
+
+def seed(db, rows: int):
+    doctor = User(email="doctor@example.com", hashed_password="x", full_name="Doctor", role=UserRole.DOCTOR)
+    patient = User(email="patient@example.com", hashed_password="x", full_name="Patient", role=UserRole.PATIENT)
+    db.add_all([doctor, patient])
+    db.flush()
+    created_at = datetime(2024, 1, 1, 8, 0)
+    db.execute(insert(Appointment), [
+        {
+            "doctor_id": doctor.id,
+            "patient_id": patient.id,
+            "appointment_date": date(2024, 1, 1) + timedelta(days=index // PER_DAY),
+            "start_time": time(8 + index % PER_DAY // 2, 30 * (index % 2)),
+            "end_time": time(8 + index % PER_DAY // 2, 30 * (index % 2) + 20),
+            "status": "scheduled",
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        for index in range(rows)
+    ])
+    db.commit()
+
+def run(rows: int, iterations: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/serialization.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            seed(db, rows)
+        order = (Appointment.appointment_date, Appointment.start_time, Appointment.id)
+        appointment_field = create_response_field("response", List[AppointmentSchema])
+
+        def default_appointments() -> bytes:
+            with Session() as db:
+                return default_response(appointment_field, db.query(Appointment).order_by(*order).all())
+
+        def fast_rows() -> List[dict]:
+            with Session() as db:
+                return rows_to_dicts(APPOINTMENT_FIELDS, db.query(*APPOINTMENT_COLUMNS).order_by(*order).all())
+
+        def fast_appointments() -> bytes:
+            return to_json(fast_rows())
+
+        results = {
+            "appointments (default)": time_call(default_appointments, iterations),
+            "appointments (fast, json)": time_call(fast_appointments, iterations),
+        }
+        if msgpack is not None:
+            results["appointments (fast, msgpack)"] = time_call(
+                lambda: msgpack.packb(to_jsonable_python(fast_rows())), iterations
+            )
+        if json.loads(default_appointments()) != json.loads(fast_appointments()):
+            raise AssertionError("The fast appointment list differs from the default one")
+
+        slots = [
+            TimeSlot(start_time=time(index % 24, index % 60), end_time=time(index % 24, index % 60), is_available=index % 3 == 0)
+            for index in range(rows)
+        ]
+        slot_field = create_response_field("response", List[TimeSlot])
+        results["slots (default)"] = time_call(lambda: default_response(slot_field, slots), iterations)
+        results["slots (fast, json)"] = time_call(lambda: to_json(slots), iterations)
+        if json.loads(default_response(slot_field, slots)) != json.loads(to_json(slots)):
+            raise AssertionError("The fast slot list differs from the default one")
+
+        engine.dispose()
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare default and fast serialization of large list responses")
+    parser.add_argument("--rows", default="1000,50000", help="Comma-separated row counts")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = {}
+    for rows in [int(value) for value in args.rows.split(",")]:
+        report[rows] = run(rows, args.iterations)
+        print(f"{rows} rows (median of {args.iterations})")
+        for name, median_ms in report[rows].items():
+            print(f"   {median_ms:>10.3f} ms   {name}")
+    if msgpack is None:
+        print("msgpack is not installed, so MessagePack was not measured")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
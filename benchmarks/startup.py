@@ -0,0 +1,131 @@
+"""
+Worker startup time.
+
+Starts fresh Python processes that import app.main, run the app's lifespan
+startup (settings and Alembic revision check, first database connection)
+and serve one request, and reports the median time of each phase across
+runs. With --importtime, also lists the modules that take longest to import.
+
+Run with: python -m benchmarks.startup [--runs 5] [--database-url URL]
+                                       [--importtime] [--output results.json]
+
+Without --database-url, a temporary SQLite database is migrated to the
+latest revision first, so the schema check passes as in production.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Runs in the child process; prints the phase timings as JSON
+WORKER = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def boot():
+    import httpx
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/health-check")
+            response.raise_for_status()
+        served = time.perf_counter()
+    return ready, served
+
+ready, served = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+}))
+"""
+
+def migrate():
+    """alembic upgrade head on DATABASE_URL"""
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config("alembic.ini"), "head")
+
+def parse_importtime(stderr: str, top: int):
+    """The slowest modules by cumulative import time from `python -X importtime` output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        # Skips the header line, whose columns are not numbers
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            modules.append((int(fields[1]), fields[2].strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in modules[:top]]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of worker processes to start")
+    parser.add_argument("--database-url", help="Database to start against (defaults to a migrated temporary SQLite file)")
+    parser.add_argument("--importtime", action="store_true", help="Also report the slowest imports")
+    parser.add_argument("--top", type=int, default=15, help="Number of slow imports to list")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db")
+        migrate()
+    env = dict(os.environ)
+    # Background jobs are not part of startup
+    env.setdefault("APPOINTMENT_ARCHIVE_JOB", "false")
+
+    def start_worker(*options):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, *options, "-c", WORKER], env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        timings["process_ms"] = (time.perf_counter() - started) * 1000
+        return timings, result.stderr
+
+    try:
+        # Import tracing slows the process down, so that run is reported but not timed
+        slow_imports = parse_importtime(start_worker("-X", "importtime")[1], args.top) if args.importtime else None
+        runs = [start_worker()[0] for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    report = {
+        "runs": len(runs),
+        "phases": {
+            phase: {
+                "median_ms": round(statistics.median(run[phase] for run in runs), 1),
+                "min_ms": round(min(run[phase] for run in runs), 1),
+                "max_ms": round(max(run[phase] for run in runs), 1),
+            }
+            for phase in ("import_ms", "lifespan_startup_ms", "first_request_ms", "process_ms")
+        },
+    }
+    if slow_imports is not None:
+        report["slowest_imports"] = slow_imports
+
+    for phase, stats in report["phases"].items():
+        print(f"{phase[:-3]:<20} median {stats['median_ms']:>8.1f} ms   min {stats['min_ms']:>8.1f} ms   max {stats['max_ms']:>8.1f} ms")
+    for entry in report.get("slowest_imports", []):
+        print(f"   {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+Benchmark suite for the scheduling hot paths.
+
+For each scale, seeds a fresh database with benchmarks.seed and times
+create_time_slots, get_doctor_available_slots (cold and cached),
+book_appointment and the list endpoints in app.routers, including response
+serialization. Results are written as JSON so runs can be compared; with
+--compare the run fails if any median got slower than the baseline by more
+than --threshold.
+
+Run with: python -m benchmarks.suite [--scales small,medium] [--database-url URL]
+                                     [--output results.json] [--compare baseline.json]
+
+When --database-url is given, its tables are dropped and recreated for
+every scale, so point it at a dedicated database.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time as timer
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Dict, List
+
+import sqlalchemy
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models.models import User, UserRole
+from app.routers.appointments import get_available_slots_range, get_next_available_slots, get_user_appointments
+from app.routers.availability import get_specific_doctor_availabilities
+from app.routers.users import get_all_doctors
+from app.schemas.schemas import Appointment as AppointmentSchema, AvailabilityDate, DoctorAvailability, NextAvailableSlot, User as UserSchema
+from app.utils.schedule import book_appointment, create_time_slots, get_doctor_available_slots, resolve_slot_engine
+from app.utils.slot_cache import slot_cache
+from benchmarks.seed import seed_database
+
+SCALES = {
+    "small": {"doctors": 10, "patients": 200, "days": 180},
+    "medium": {"doctors": 50, "patients": 2000, "days": 730},
+    "large": {"doctors": 200, "patients": 10000, "days": 1825},
+}
+
+# Response models used to include serialization in the endpoint timings
+APPOINTMENT_LIST = TypeAdapter(List[AppointmentSchema])
+USER_LIST = TypeAdapter(List[UserSchema])
+AVAILABILITY_LIST = TypeAdapter(List[DoctorAvailability])
+AVAILABILITY_DATE_LIST = TypeAdapter(List[AvailabilityDate])
+NEXT_AVAILABLE_LIST = TypeAdapter(List[NextAvailableSlot])
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def measure(calls: List[Callable[[], object]]) -> dict:
+    """Time each call once and summarize the durations in milliseconds"""
+    durations = []
+    for call in calls:
+        started = timer.perf_counter()
+        call()
+        durations.append((timer.perf_counter() - started) * 1000)
+    durations.sort()
+    return {
+        "iterations": len(durations),
+        "mean_ms": round(sum(durations) / len(durations), 4),
+        "min_ms": round(durations[0], 4),
+        "p50_ms": round(percentile(durations, 0.5), 4),
+        "p95_ms": round(percentile(durations, 0.95), 4),
+        "max_ms": round(durations[-1], 4),
+    }
+
+def uncached(call: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        slot_cache.clear()
+        return call()
+    return run
+
+def run_scale(database_url: str, params: dict, iterations: int, seed: int) -> dict:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    slot_cache.clear()
+
+    started = timer.perf_counter()
+    with Session() as db:
+        rows = seed_database(db, seed=seed, **params)
+        db.execute(text("ANALYZE"))
+        db.commit()
+    seed_seconds = timer.perf_counter() - started
+
+    rng = random.Random(seed)
+    today = date.today()
+    results: Dict[str, dict] = {}
+
+    with Session() as db:
+        doctors = db.query(User).filter(User.role == UserRole.DOCTOR).all()
+        patients = db.query(User).filter(User.role == UserRole.PATIENT).limit(iterations).all()
+        history = [today + timedelta(days=offset) for offset in range(-params["days"] // 2, params["days"] // 2)]
+        weekdays = [day for day in history if day.weekday() < 5]
+
+        def random_day():
+            return rng.choice(doctors).id, rng.choice(weekdays)
+
+        results["create_time_slots"] = measure(
+            [lambda: create_time_slots(time(9, 0), time(17, 0), 40)] * iterations
+        )
+
+        samples = [random_day() for _ in range(iterations)]
+        results["get_doctor_available_slots (cold)"] = measure([
+            uncached(lambda doctor_id=doctor_id, day=day: get_doctor_available_slots(db, doctor_id, day))
+            for doctor_id, day in samples
+        ])
+        for doctor_id, day in samples:
+            get_doctor_available_slots(db, doctor_id, day)
+        results["get_doctor_available_slots (cached)"] = measure([
+            lambda doctor_id=doctor_id, day=day: get_doctor_available_slots(db, doctor_id, day)
+            for doctor_id, day in samples
+        ])
+
+        # Book slots that the seeded data left free, in the future
+        future_days = [day for day in weekdays if day > today]
+        bookings, chosen = [], set()
+        while len(bookings) < iterations:
+            doctor, day = rng.choice(doctors), rng.choice(future_days)
+            free = [slot for slot in get_doctor_available_slots(db, doctor.id, day).time_slots if slot.is_available]
+            if free:
+                slot = rng.choice(free)
+                if (doctor.id, day, slot.start_time) not in chosen:
+                    chosen.add((doctor.id, day, slot.start_time))
+                    bookings.append((doctor.id, rng.choice(patients).id, day, slot.start_time))
+        results["book_appointment"] = measure([
+            lambda booking=booking: book_appointment(db, *booking) for booking in bookings
+        ])
+
+        doctor, patient = doctors[0], patients[0]
+        results["GET /appointments (doctor, first page)"] = measure([
+            lambda: APPOINTMENT_LIST.dump_json(get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=None, end_date=None, limit=100, cursor=None
+            ))
+        ] * iterations)
+        results["GET /appointments (patient, first page)"] = measure([
+            lambda: APPOINTMENT_LIST.dump_json(get_user_appointments(
+                request=None, response=Response(), db=db, current_user=patient, start_date=None, end_date=None, limit=100, cursor=None
+            ))
+        ] * iterations)
+        results["GET /appointments (doctor, 30 days)"] = measure([
+            lambda day=day: APPOINTMENT_LIST.dump_json(get_user_appointments(
+                request=None, response=Response(), db=db, current_user=doctor, start_date=day, end_date=day + timedelta(days=29),
+                limit=500, cursor=None
+            ))
+            for _, day in samples
+        ])
+        results["GET /users/doctors"] = measure([
+            lambda: USER_LIST.dump_json(get_all_doctors(
+                request=None, response=Response(), db=db, current_user=patient, if_none_match=None
+            ))
+        ] * iterations)
+        results["GET /availability/{doctor_id}"] = measure([
+            lambda doctor_id=doctor_id: AVAILABILITY_LIST.dump_json(get_specific_doctor_availabilities(
+                doctor_id, request=None, response=Response(), db=db, current_user=patient, if_none_match=None
+            ))
+            for doctor_id, _ in samples
+        ])
+        results["GET /appointments/doctor/{doctor_id}/slots/range (28 days, cold)"] = measure([
+            uncached(lambda doctor_id=doctor_id, day=day: AVAILABILITY_DATE_LIST.dump_json(get_available_slots_range(
+                doctor_id, request=None, start_date=day, end_date=day + timedelta(days=27), db=db, current_user=patient
+            )))
+            for doctor_id, day in samples
+        ])
+        results["GET /appointments/next-available"] = measure([
+            lambda day=day: NEXT_AVAILABLE_LIST.dump_json(get_next_available_slots(
+                request=None, start_date=day, limit=10, horizon_days=14, doctor_ids=None, db=db, current_user=patient
+            ))
+            for day in future_days[:iterations]
+        ])
+
+    engine.dispose()
+    return {
+        "params": params,
+        "rows": rows,
+        "seed_seconds": round(seed_seconds, 3),
+        "results": results,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Benchmarks whose median is more than `threshold` times the baseline median"""
+    regressions = []
+    for scale, scale_report in report["scales"].items():
+        baseline_results = baseline.get("scales", {}).get(scale, {}).get("results", {})
+        for name, stats in scale_report["results"].items():
+            previous = baseline_results.get(name)
+            if previous and stats["p50_ms"] > previous["p50_ms"] * threshold:
+                regressions.append(
+                    f"{scale} / {name}: p50 {previous['p50_ms']:.3f} ms -> {stats['p50_ms']:.3f} ms"
+                )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small,medium", help=f"Comma separated, from {', '.join(SCALES)}")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per benchmark")
+    parser.add_argument("--database-url", help="Database to run against (defaults to a temporary SQLite file per scale)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed p50 slowdown factor against the baseline")
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"Unknown scale(s): {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "database": make_url(args.database_url).get_backend_name() if args.database_url else "sqlite",
+            "slot_engine": resolve_slot_engine(),
+            "iterations": args.iterations,
+        },
+        "scales": {},
+    }
+    for scale in scales:
+        database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), f"bench_{scale}.db")
+        print(f"Running {scale} scale ({SCALES[scale]})", file=sys.stderr)
+        report["scales"][scale] = run_scale(database_url, SCALES[scale], args.iterations, args.seed)
+        for name, stats in report["scales"][scale]["results"].items():
+            print(f"   {name:<66} p50 {stats['p50_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,13 +6,12 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-from dotenv import load_dotenv
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-# Load environment variables from .env file
-load_dotenv()
+# Settings are read from the environment or the .env file, like the app does
+from app.settings import get_settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -22,8 +21,8 @@ config = context.config
 # This line sets up loggers basically.
 fileConfig(config.config_file_name)
 
-# Get database URL from environment variable
-database_url = os.getenv("DATABASE_URL")
+# Get database URL from the settings
+database_url = get_settings().database_url
 config.set_main_option("sqlalchemy.url", database_url)
 
 # add your model's MetaData object here
@@ -0,0 +1,26 @@
+"""Add archive change feed indexes
+
+Revision ID: 3d8a1f6b2c47
+Revises: 9b2e5d7c3a14
+Create Date: 2026-10-17 21:16:52.940361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8a1f6b2c47'
+down_revision = '9b2e5d7c3a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_appointments_archive_doctor_id_archived_at_id', 'appointments_archive', ['doctor_id', 'archived_at', 'id'], unique=False)
+    op.create_index('ix_appointments_archive_patient_id_archived_at_id', 'appointments_archive', ['patient_id', 'archived_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_appointments_archive_patient_id_archived_at_id', table_name='appointments_archive')
+    op.drop_index('ix_appointments_archive_doctor_id_archived_at_id', table_name='appointments_archive')
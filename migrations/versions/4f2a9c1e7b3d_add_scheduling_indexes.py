@@ -0,0 +1,37 @@
+"""Add scheduling indexes
+
+Revision ID: 4f2a9c1e7b3d
+Revises: dc61f308e708
+Create Date: 2026-10-17 10:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2a9c1e7b3d'
+down_revision = 'dc61f308e708'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_appointments_doctor_id_date_status', 'appointments', ['doctor_id', 'appointment_date', 'status'], unique=False)
+    op.create_index('ix_appointments_patient_id_date', 'appointments', ['patient_id', 'appointment_date'], unique=False)
+    op.create_index(
+        'ix_appointments_active_date_doctor_id',
+        'appointments',
+        ['appointment_date', 'doctor_id', 'start_time', 'end_time'],
+        unique=False,
+        postgresql_where=sa.text("status <> 'cancelled'"),
+        sqlite_where=sa.text("status <> 'cancelled'")
+    )
+    op.create_index('ix_doctor_availability_doctor_id_day_of_week', 'doctor_availability', ['doctor_id', 'day_of_week'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_doctor_availability_doctor_id_day_of_week', table_name='doctor_availability')
+    op.drop_index('ix_appointments_active_date_doctor_id', table_name='appointments')
+    op.drop_index('ix_appointments_patient_id_date', table_name='appointments')
+    op.drop_index('ix_appointments_doctor_id_date_status', table_name='appointments')
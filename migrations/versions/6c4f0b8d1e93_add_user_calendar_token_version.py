@@ -0,0 +1,25 @@
+"""Add user calendar token version
+
+Revision ID: 6c4f0b8d1e93
+Revises: 3d8a1f6b2c47
+Create Date: 2026-10-17 22:08:14.517902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c4f0b8d1e93'
+down_revision = '3d8a1f6b2c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tokens issued so far carry no version and count as version 0
+    op.add_column('users', sa.Column('calendar_token_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'calendar_token_version')
@@ -0,0 +1,33 @@
+"""Add active slot unique index
+
+Revision ID: 8c3d5e0a2f61
+Revises: 4f2a9c1e7b3d
+Create Date: 2026-10-17 11:03:19.742915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3d5e0a2f61'
+down_revision = '4f2a9c1e7b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing duplicate active bookings of the same slot must be resolved
+    # (e.g. cancelled) before this index can be created
+    op.create_index(
+        'uq_appointments_active_slot',
+        'appointments',
+        ['doctor_id', 'appointment_date', 'start_time'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'cancelled'"),
+        sqlite_where=sa.text("status <> 'cancelled'")
+    )
+
+
+def downgrade():
+    op.drop_index('uq_appointments_active_slot', table_name='appointments')
@@ -0,0 +1,30 @@
+"""Add job leases
+
+Revision ID: 9b2e5d7c3a14
+Revises: f41c7a2d8e60
+Create Date: 2026-10-17 20:42:18.305716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e5d7c3a14'
+down_revision = 'f41c7a2d8e60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job_leases',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('holder', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('job_leases')
@@ -0,0 +1,44 @@
+"""Add slots table
+
+Revision ID: b7e1d4a9c052
+Revises: 8c3d5e0a2f61
+Create Date: 2026-10-17 15:42:08.163540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1d4a9c052'
+down_revision = '8c3d5e0a2f61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `python -m app.utils.slot_table` (or the app's roll-forward
+    # job) once SLOT_STORE=table is enabled
+    op.create_table(
+        'slots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('availability_id', sa.Integer(), nullable=False),
+        sa.Column('slot_date', sa.Date(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('is_available', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['availability_id'], ['doctor_availability.id'], ),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_slots_doctor_id_date_start_time', 'slots', ['doctor_id', 'slot_date', 'start_time'], unique=True)
+    op.create_index('ix_slots_date_start_time', 'slots', ['slot_date', 'start_time'], unique=False)
+    op.create_index('ix_slots_availability_id', 'slots', ['availability_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_slots_availability_id', table_name='slots')
+    op.drop_index('ix_slots_date_start_time', table_name='slots')
+    op.drop_index('uq_slots_doctor_id_date_start_time', table_name='slots')
+    op.drop_table('slots')
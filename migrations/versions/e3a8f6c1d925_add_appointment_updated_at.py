@@ -0,0 +1,30 @@
+"""Add appointment updated_at
+
+Revision ID: e3a8f6c1d925
+Revises: b7e1d4a9c052
+Create Date: 2026-10-17 17:20:51.407316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a8f6c1d925'
+down_revision = 'b7e1d4a9c052'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('appointments', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Existing appointments enter the change feed at their creation time
+    op.execute("UPDATE appointments SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.create_index('ix_appointments_doctor_id_updated_at_id', 'appointments', ['doctor_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_appointments_patient_id_updated_at_id', 'appointments', ['patient_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_appointments_patient_id_updated_at_id', table_name='appointments')
+    op.drop_index('ix_appointments_doctor_id_updated_at_id', table_name='appointments')
+    op.drop_column('appointments', 'updated_at')
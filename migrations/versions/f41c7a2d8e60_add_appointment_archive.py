@@ -0,0 +1,70 @@
+"""Add appointment status enum and archive table
+
+Revision ID: f41c7a2d8e60
+Revises: e3a8f6c1d925
+Create Date: 2026-10-17 19:05:37.482915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41c7a2d8e60'
+down_revision = 'e3a8f6c1d925'
+branch_labels = None
+depends_on = None
+
+STATUS_CHECK = "status IN ('scheduled', 'completed', 'cancelled')"
+
+
+def upgrade():
+    # Statuses were free-form strings; anything else has to be fixed by hand
+    # before the constraint below can be created
+    op.execute("UPDATE appointments SET status = 'scheduled' WHERE status IS NULL")
+    op.execute("UPDATE appointments SET status = LOWER(TRIM(status)) WHERE status <> LOWER(TRIM(status))")
+    # SQLite cannot add constraints to an existing table; there the status is
+    # only enforced by the application (and by tables created from the models)
+    if op.get_context().dialect.name != 'sqlite':
+        op.alter_column('appointments', 'status', existing_type=sa.String(), type_=sa.String(length=9), nullable=False)
+        op.create_check_constraint('appointment_status', 'appointments', STATUS_CHECK)
+    op.create_index('ix_appointments_date_id', 'appointments', ['appointment_date', 'id'], unique=False)
+
+    # Filled by `python -m app.utils.archive` (or the app's archival job)
+    op.create_table(
+        'appointments_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('appointment_date', sa.Date(), nullable=True),
+        sa.Column('start_time', sa.Time(), nullable=True),
+        sa.Column('end_time', sa.Time(), nullable=True),
+        sa.Column('status', sa.String(length=9), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.CheckConstraint(STATUS_CHECK, name='appointment_status'),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['patient_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_appointments_archive_doctor_id_date', 'appointments_archive', ['doctor_id', 'appointment_date', 'start_time', 'id'], unique=False)
+    op.create_index('ix_appointments_archive_patient_id_date', 'appointments_archive', ['patient_id', 'appointment_date', 'start_time', 'id'], unique=False)
+    op.create_index('ix_appointments_archive_date', 'appointments_archive', ['appointment_date'], unique=False)
+
+
+def downgrade():
+    # Archived appointments go back to the hot table first
+    op.execute(
+        "INSERT INTO appointments (id, doctor_id, patient_id, appointment_date, start_time, end_time, status, created_at, updated_at) "
+        "SELECT id, doctor_id, patient_id, appointment_date, start_time, end_time, status, created_at, updated_at "
+        "FROM appointments_archive"
+    )
+    op.drop_index('ix_appointments_archive_date', table_name='appointments_archive')
+    op.drop_index('ix_appointments_archive_patient_id_date', table_name='appointments_archive')
+    op.drop_index('ix_appointments_archive_doctor_id_date', table_name='appointments_archive')
+    op.drop_table('appointments_archive')
+    op.drop_index('ix_appointments_date_id', table_name='appointments')
+    if op.get_context().dialect.name != 'sqlite':
+        op.drop_constraint('appointment_status', 'appointments', type_='check')
+        op.alter_column('appointments', 'status', existing_type=sa.String(length=9), type_=sa.String(), nullable=True)